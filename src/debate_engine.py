@@ -1,12 +1,137 @@
 """Debate orchestration engine — controls round flow and model calls."""
 
 import asyncio
+import contextlib
+import functools
+import io
+import weakref
 from datetime import datetime
 
 from . import llm_client, prompts, session_store
 from .models import RoundResponse
 
 
+class _RWLock:
+    """Async readers-writer lock; waiting writers block new readers (writer priority)."""
+
+    def __init__(self):
+        self._readers = 0
+        self._readers_mutex = asyncio.Lock()  # guards _readers
+        self._room = asyncio.Lock()           # held by one writer, or by the group of readers
+        self._turnstile = asyncio.Lock()      # a queued writer holds this so new readers wait
+        self._changed = asyncio.Event()       # set (and replaced) each time a writer releases
+
+    def changed_event(self) -> asyncio.Event:
+        """Event that fires on the next write release. Grab it *before* reading state."""
+        return self._changed
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self._turnstile:
+            pass
+        async with self._readers_mutex:
+            # Count ourselves only once the room is ours: a first reader cancelled while waiting
+            # for it (e.g. under wait_for) must not leave later readers thinking it is held
+            if self._readers == 0:
+                await self._room.acquire()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            # No await here, so this can't be cancelled halfway (and needs no mutex: the loop
+            # runs nothing else between the decrement and the release)
+            self._readers -= 1
+            if self._readers == 0:
+                self._room.release()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self._turnstile:
+            await self._room.acquire()
+        try:
+            yield
+        finally:
+            self._room.release()
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+
+# Per-session locks for atomic state updates. Weak values: an entry goes away once no coroutine
+# references its lock, so a long-running server doesn't keep one lock per session ever touched.
+# Callers that wait on a lock's change event must keep the lock itself referenced meanwhile.
+_session_locks: "weakref.WeakValueDictionary[str, _RWLock]" = weakref.WeakValueDictionary()
+
+
+def get_lock(session_id: str) -> _RWLock:
+    # Only called from the event loop and never awaits between lookup and insert, so two
+    # coroutines can't both create a lock for the same session. Don't call it from to_thread.
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _RWLock()
+        _session_locks[session_id] = lock
+    return lock
+
+
+async def _load_state(session_id: str):
+    """Load session state under the session's read lock."""
+    async with get_lock(session_id).read():
+        return session_store.load_session(session_id)
+
+
+def _live_session(fn):
+    """Keep the session's state live in memory for the duration of a round.
+
+    Every load and store mutation during the round then operates on one object,
+    so the round never has to re-read session.json to see its own writes or new notes.
+    """
+    @functools.wraps(fn)
+    async def wrapper(session_id: str):
+        session_store.attach_live(await _load_state(session_id))
+        try:
+            return await fn(session_id)
+        finally:
+            session_store.detach_live(session_id)
+    return wrapper
+
+
+@functools.lru_cache(maxsize=512)
+def _build_system(role: str, instructions: str, model_name: str,
+                  position: str = "", round_num: int = 0) -> str:
+    """System prompt for ``role`` (e.g. "ATTACK"), memoized.
+
+    The role's static block and the session's instructions come first so the prefix is shared by
+    every model and round; the formatted assignment block goes last.
+    """
+    static = getattr(prompts, f"{role}_SYSTEM_STATIC")
+    dynamic = getattr(prompts, f"{role}_SYSTEM_DYNAMIC")
+    return (prompts.inject_instructions(static, instructions)
+            + dynamic.format(model_name=model_name, position=position, round_num=round_num))
+
+
+class _MdWriter:
+    """Accumulate a markdown export in one buffer instead of joining a list of large parts."""
+
+    def __init__(self, header: str = ""):
+        self._buf = io.StringIO()
+        self._buf.write(header)
+
+    def write(self, text: str) -> None:
+        self._buf.write(text)
+
+    def hr(self) -> None:
+        self._buf.write("\n---\n\n")
+
+    def section(self, title: str, body: str) -> None:
+        """Append a horizontal rule followed by a ``## title`` section."""
+        self.hr()
+        self._buf.write(f"## {title}\n\n")
+        self._buf.write(body)
+        self._buf.write("\n")
+
+    def getvalue(self) -> str:
+        return self._buf.getvalue()
+
+
 def _get_model_for_position(session_state, position: str) -> str:
     """Get the model name assigned to a position."""
     for pa in session_state.positions:
@@ -17,16 +142,19 @@ def _get_model_for_position(session_state, position: str) -> str:
 
 def _session_header(state) -> str:
     """Build a markdown header with session metadata (idea, background, instructions)."""
-    parts = [f"**Title:** {state.title}\n"]
-    parts.append(f"**Research Idea:**\n\n{state.idea}\n")
-    if state.instructions:
-        parts.append(f"**Instructions:** {state.instructions}\n")
+    instructions = f"\n**Instructions:** {state.instructions}\n" if state.instructions else ""
+    background = ""
     if state.background:
         bg = state.background
         if len(bg) > 2000:
             bg = bg[:2000] + "\n\n*(background truncated in export — full text in session.json)*"
-        parts.append(f"**Background Context:**\n\n{bg}\n")
-    return "\n".join(parts)
+        background = f"\n**Background Context:**\n\n{bg}\n"
+    return f"**Title:** {state.title}\n\n**Research Idea:**\n\n{state.idea}\n{instructions}{background}"
+
+
+def _format_notes(notes) -> str:
+    """Bullet list of user note texts for summary/synthesis prompts ("None" if empty)."""
+    return "\n".join(f"- {n.text}" for n in notes) if notes else "None"
 
 
 def _notes_section(state, up_to_phase: str = "") -> str:
@@ -34,10 +162,8 @@ def _notes_section(state, up_to_phase: str = "") -> str:
     notes = state.user_notes
     if not notes:
         return ""
-    parts = ["\n**User Notes:**\n"]
-    for n in notes:
-        parts.append(f"- _{n.after_phase}_ — {n.text}")
-    return "\n".join(parts) + "\n"
+    items = "\n".join(f"- _{n.after_phase}_ — {n.text}" for n in notes)
+    return f"\n**User Notes:**\n\n{items}\n"
 
 
 async def _call_and_record(
@@ -47,9 +173,8 @@ async def _call_and_record(
     phase: str,
     system_prompt: str,
     user_prompt: str,
-    lock: asyncio.Lock,
 ) -> RoundResponse:
-    """Call a model and record the response atomically."""
+    """Call a model and record the response in the live session state."""
     result = await llm_client.call_model(model_name, system_prompt, user_prompt)
 
     response = RoundResponse(
@@ -63,30 +188,40 @@ async def _call_and_record(
         error=result.error,
     )
 
-    async with lock:
-        session_store.append_response(session_id, response)
+    # Buffer in the live session; the round persists all of its responses in one save
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.record_response, session_id, response)
 
     return response
 
 
-async def _generate_summary(session_id: str, round_key: str, round_name: str, lock: asyncio.Lock):
+async def _persist_round(session_id: str, filename: str, markdown: _MdWriter, state=None):
+    """Write a round's markdown export and, if given, the updated session state."""
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.save_markdown, session_id, filename, markdown)
+        if state is not None:
+            await asyncio.to_thread(session_store.save_session, state)
+
+
+async def _generate_summary(session_id: str, round_key: str, round_name: str, state=None):
     """Generate a moderator summary for a round using Claude. Non-blocking on failure."""
     try:
         return await asyncio.wait_for(
-            _generate_summary_impl(session_id, round_key, round_name, lock),
+            _generate_summary_impl(session_id, round_key, round_name, state),
             timeout=180.0,
         )
     except (asyncio.TimeoutError, Exception) as e:
         # Don't block the round if summary fails
         fallback = f"(Summary generation failed: {e})"
-        async with lock:
-            session_store.update_summary(session_id, round_key, fallback)
+        async with get_lock(session_id).write():
+            await asyncio.to_thread(session_store.update_summary, session_id, round_key, fallback)
         return fallback
 
 
-async def _generate_summary_impl(session_id: str, round_key: str, round_name: str, lock: asyncio.Lock):
-    """Internal summary generation."""
-    state = session_store.load_session(session_id)
+async def _generate_summary_impl(session_id: str, round_key: str, round_name: str, state=None):
+    """Internal summary generation. Reuses ``state`` when the caller already has it fresh."""
+    if state is None:
+        state = await _load_state(session_id)
 
     # Collect responses for this round
     if round_key == "r1":
@@ -97,10 +232,17 @@ async def _generate_summary_impl(session_id: str, round_key: str, round_name: st
     else:
         phases = [round_key]
 
-    responses = [r for r in state.responses if r.phase in phases]
+    responses = state.responses_for(*phases)
 
-    responses_text = prompts.format_responses_for_summary(responses)
-    notes_text = "\n".join(f"- {n.text}" for n in state.user_notes) if state.user_notes else "None"
+    # Nothing to summarize: don't spend a Claude call on it
+    if all(r.error for r in responses):
+        skipped = "(Skipped: all responses errored)" if responses else "(Skipped: no responses)"
+        async with get_lock(session_id).write():
+            await asyncio.to_thread(session_store.update_summary, session_id, round_key, skipped)
+        return skipped
+
+    responses_text = prompts.format_phases_for_summary(state, *phases)
+    notes_text = _format_notes(state.user_notes)
 
     system = prompts.inject_instructions(prompts.SUMMARY_SYSTEM, state.instructions)
     user = prompts.SUMMARY_USER.format(
@@ -111,16 +253,19 @@ async def _generate_summary_impl(session_id: str, round_key: str, round_name: st
 
     result = await llm_client.call_model("claude", system, user)
 
-    async with lock:
-        session_store.update_summary(session_id, round_key, result.text)
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_summary, session_id, round_key, result.text)
 
     return result.text
 
 
-async def run_round1(session_id: str, lock: asyncio.Lock):
+@_live_session
+async def run_round1(session_id: str):
     """Round 1: All 4 models as neutral discussants (parallel)."""
-    session_store.update_status(session_id, "r1_running")
-    state = session_store.load_session(session_id)
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, "r1_running")
+    state = await _load_state(session_id)
+    pos_to_model = {pa.position: pa.model_name for pa in state.positions}
 
     # Build context with background
     context = ""
@@ -129,35 +274,38 @@ async def run_round1(session_id: str, lock: asyncio.Lock):
 
     tasks = []
     for pos in ["S1", "S2", "O1", "O2"]:
-        model_name = _get_model_for_position(state, pos)
-        system = prompts.inject_instructions(
-            prompts.ROUND1_SYSTEM.format(model_name=model_name), state.instructions)
+        model_name = pos_to_model[pos]
+        system = _build_system("ROUND1", state.instructions, model_name)
         user = prompts.ROUND1_USER.format(idea=state.idea, context=context)
-        tasks.append(_call_and_record(session_id, pos, model_name, "r1", system, user, lock))
+        tasks.append(_call_and_record(session_id, pos, model_name, "r1", system, user))
 
     results = await asyncio.gather(*tasks)
 
     # Save markdown
-    md_parts = [f"# Round 1: Neutral Discussion\n\nStage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
-                + _session_header(state)]
+    md = _MdWriter(f"# Round 1: Neutral Discussion\n\nStage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
+    md.write(_session_header(state))
     for r in results:
         status = f"**ERROR: {r.error}**" if r.error else r.text
-        md_parts.append(f"## {r.position} — {r.model_name}\n\n{status}\n")
-    session_store.save_markdown(session_id, "round1.md", "\n---\n\n".join(md_parts))
-
-    # Generate summary
-    await _generate_summary(session_id, "r1", "Round 1 (Neutral Discussion)", lock)
+        md.section(f"{r.position} — {r.model_name}", status)
+    # Persist markdown and the buffered responses while the summary call is in flight
+    await asyncio.gather(
+        _persist_round(session_id, "round1.md", md, state),
+        _generate_summary(session_id, "r1", "Round 1 (Neutral Discussion)"),
+    )
 
-    session_store.update_status(session_id, "r1_pause")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, "r1_pause")
 
 
-async def run_debate_round(session_id: str, lock: asyncio.Lock):
+@_live_session
+async def run_debate_round(session_id: str):
     """Run one debate round (attack then defense). Supports infinite rounds with role swapping.
 
     Odd rounds (1, 3, 5...): O1+O2 attack, S1+S2 defend
     Even rounds (2, 4, 6...): S1+S2 attack (swap), O1+O2 defend (swap)
     """
-    state = session_store.load_session(session_id)
+    state = await _load_state(session_id)
+    pos_to_model = {pa.position: pa.model_name for pa in state.positions}
     round_num = state.current_round + 1
     is_swap = (round_num % 2 == 0)
 
@@ -172,131 +320,137 @@ async def run_debate_round(session_id: str, lock: asyncio.Lock):
         defenders = ["S1", "S2"]
 
     # Phase 1: Attacks
-    session_store.update_status(session_id, f"debate_{round_num}_attacks_running")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, f"debate_{round_num}_attacks_running")
     context = prompts.build_context(state, attack_phase)
 
     attack_tasks = []
     for pos in attackers:
-        model_name = _get_model_for_position(state, pos)
+        model_name = pos_to_model[pos]
         if is_swap:
-            system = prompts.SWAP_ATTACK_SYSTEM.format(
-                model_name=model_name, position=pos, round_num=round_num)
+            system = _build_system("SWAP_ATTACK", state.instructions, model_name, pos, round_num)
         else:
-            system = prompts.ATTACK_SYSTEM.format(model_name=model_name, position=pos)
-        system = prompts.inject_instructions(system, state.instructions)
+            system = _build_system("ATTACK", state.instructions, model_name, pos)
         user = prompts.ATTACK_USER.format(idea=state.idea, context=context, position=pos)
         attack_tasks.append(_call_and_record(
-            session_id, pos, model_name, attack_phase, system, user, lock))
+            session_id, pos, model_name, attack_phase, system, user))
 
     attack_results = await asyncio.gather(*attack_tasks)
 
     # Save attack markdown
     swap_label = " (Role Swap)" if is_swap else ""
-    state = session_store.load_session(session_id)  # reload to get latest notes
-    md_parts = [f"# Debate Round {round_num}: Attacks{swap_label}\n\n"
-                f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-                + _notes_section(state)]
+    md = _MdWriter(f"# Debate Round {round_num}: Attacks{swap_label}\n\n"
+                   f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    md.write(_notes_section(state))
     for r in attack_results:
         status = f"**ERROR: {r.error}**" if r.error else r.text
         role_label = "NOW OPPONENT" if is_swap else "OPPONENT"
-        md_parts.append(f"## {r.position} ({r.model_name}) — {role_label}\n\n{status}\n")
-    session_store.save_markdown(session_id, f"debate_{round_num}_attacks.md", "\n---\n\n".join(md_parts))
+        md.section(f"{r.position} ({r.model_name}) — {role_label}", status)
+    await _persist_round(session_id, f"debate_{round_num}_attacks.md", md, state)
 
     # Phase 2: Defenses (seeing attacks)
-    session_store.update_status(session_id, f"debate_{round_num}_defenses_running")
-    state = session_store.load_session(session_id)  # reload to get attacks
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, f"debate_{round_num}_defenses_running")
     context = prompts.build_context(state, defense_phase)
     attacks_text = "\n\n".join(
         f"### {r.position} ({r.model_name})\n\n{r.text}" for r in attack_results if not r.error
     )
 
+    # The attacks + context header is identical for both defenders; format it once
+    if is_swap:
+        user_header = prompts.SWAP_DEFEND_USER_HEADER.format(
+            idea=state.idea, attacks=attacks_text, context=context, round_num=round_num)
+    else:
+        user_header = prompts.DEFEND_USER_HEADER.format(idea=state.idea, attacks=attacks_text, context=context)
+
     defense_tasks = []
     for pos in defenders:
-        model_name = _get_model_for_position(state, pos)
+        model_name = pos_to_model[pos]
         if is_swap:
-            system = prompts.SWAP_DEFEND_SYSTEM.format(
-                model_name=model_name, position=pos, round_num=round_num)
-            user = prompts.SWAP_DEFEND_USER.format(
-                idea=state.idea, attacks=attacks_text, context=context, round_num=round_num, position=pos)
+            system = _build_system("SWAP_DEFEND", state.instructions, model_name, pos, round_num)
+            user = user_header + prompts.SWAP_DEFEND_USER_POSITION.format(position=pos, round_num=round_num)
         else:
-            system = prompts.DEFEND_SYSTEM.format(model_name=model_name, position=pos)
-            user = prompts.DEFEND_USER.format(idea=state.idea, attacks=attacks_text, context=context, position=pos)
-        system = prompts.inject_instructions(system, state.instructions)
+            system = _build_system("DEFEND", state.instructions, model_name, pos)
+            user = user_header + prompts.DEFEND_USER_POSITION.format(position=pos)
         defense_tasks.append(_call_and_record(
-            session_id, pos, model_name, defense_phase, system, user, lock))
+            session_id, pos, model_name, defense_phase, system, user))
 
     defense_results = await asyncio.gather(*defense_tasks)
 
     # Save defense markdown
-    md_parts = [f"# Debate Round {round_num}: Defenses{swap_label}\n\n"
-                f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"]
+    md = _MdWriter(f"# Debate Round {round_num}: Defenses{swap_label}\n\n"
+                   f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
     for r in defense_results:
         status = f"**ERROR: {r.error}**" if r.error else r.text
         role_label = "NOW SUPPORTER" if is_swap else "SUPPORTER"
-        md_parts.append(f"## {r.position} ({r.model_name}) — {role_label}\n\n{status}\n")
-    session_store.save_markdown(session_id, f"debate_{round_num}_defenses.md", "\n---\n\n".join(md_parts))
+        md.section(f"{r.position} ({r.model_name}) — {role_label}", status)
 
-    # Update round counter
-    state = session_store.load_session(session_id)
+    # Update round counter; persist it alongside the markdown while the summary call is in flight.
+    # The persist coroutine goes first so its save lands before the summary is written.
     state.current_round = round_num
-    session_store.save_session(state)
-
-    # Generate summary
-    await _generate_summary(session_id, f"debate_{round_num}",
-                            f"Debate Round {round_num}{swap_label}", lock)
+    await asyncio.gather(
+        _persist_round(session_id, f"debate_{round_num}_defenses.md", md, state),
+        _generate_summary(session_id, f"debate_{round_num}",
+                          f"Debate Round {round_num}{swap_label}", state),
+    )
 
-    session_store.update_status(session_id, f"debate_{round_num}_pause")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, f"debate_{round_num}_pause")
 
 
-async def run_roundtable(session_id: str, lock: asyncio.Lock):
+@_live_session
+async def run_roundtable(session_id: str):
     """Roundtable: All 4 models as collaborative discussants (no forced sides)."""
-    state = session_store.load_session(session_id)
+    state = await _load_state(session_id)
+    pos_to_model = {pa.position: pa.model_name for pa in state.positions}
     round_num = state.current_round + 1
     phase = f"roundtable_{round_num}"
 
-    session_store.update_status(session_id, f"roundtable_{round_num}_running")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, f"roundtable_{round_num}_running")
     context = prompts.build_context(state, phase)
 
     tasks = []
     for pos in ["S1", "S2", "O1", "O2"]:
-        model_name = _get_model_for_position(state, pos)
-        system = prompts.inject_instructions(
-            prompts.ROUNDTABLE_SYSTEM.format(model_name=model_name, round_num=round_num),
-            state.instructions)
+        model_name = pos_to_model[pos]
+        system = _build_system("ROUNDTABLE", state.instructions, model_name, round_num=round_num)
         user = prompts.ROUNDTABLE_USER.format(idea=state.idea, context=context, round_num=round_num)
-        tasks.append(_call_and_record(session_id, pos, model_name, phase, system, user, lock))
+        tasks.append(_call_and_record(session_id, pos, model_name, phase, system, user))
 
     results = await asyncio.gather(*tasks)
 
     # Save markdown
-    state = session_store.load_session(session_id)  # reload to get latest notes
-    md_parts = [f"# Roundtable Round {round_num}\n\n"
-                f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-                + _notes_section(state)]
+    md = _MdWriter(f"# Roundtable Round {round_num}\n\n"
+                   f"Stage {state.stage} | {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    md.write(_notes_section(state))
     for r in results:
         status = f"**ERROR: {r.error}**" if r.error else r.text
-        md_parts.append(f"## {r.position} — {r.model_name}\n\n{status}\n")
-    session_store.save_markdown(session_id, f"roundtable_{round_num}.md", "\n---\n\n".join(md_parts))
+        md.section(f"{r.position} — {r.model_name}", status)
 
-    # Update round counter
-    state = session_store.load_session(session_id)
+    # Update round counter; persist it alongside the markdown while the summary call is in flight
     state.current_round = round_num
-    session_store.save_session(state)
-
-    # Generate summary
-    await _generate_summary(session_id, f"roundtable_{round_num}",
-                            f"Roundtable Round {round_num}", lock)
+    await asyncio.gather(
+        _persist_round(session_id, f"roundtable_{round_num}.md", md, state),
+        _generate_summary(session_id, f"roundtable_{round_num}",
+                          f"Roundtable Round {round_num}", state),
+    )
 
-    session_store.update_status(session_id, f"roundtable_{round_num}_pause")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, f"roundtable_{round_num}_pause")
 
 
-async def run_synthesis(session_id: str, lock: asyncio.Lock):
+@_live_session
+async def run_synthesis(session_id: str):
     """Final synthesis by Claude moderator."""
-    session_store.update_status(session_id, "synthesis_running")
-    state = session_store.load_session(session_id)
-
-    full_transcript = prompts.build_full_transcript(state)
-    notes_text = "\n".join(f"- {n.text}" for n in state.user_notes) if state.user_notes else "None"
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.update_status, session_id, "synthesis_running")
+    state = await _load_state(session_id)
+
+    # Both walk the whole session; build them on worker threads instead of the event loop
+    full_transcript, notes_text = await asyncio.gather(
+        asyncio.to_thread(prompts.build_full_transcript, state),
+        asyncio.to_thread(_format_notes, state.user_notes),
+    )
 
     system = prompts.inject_instructions(prompts.SYNTHESIS_SYSTEM, state.instructions)
     user = prompts.SYNTHESIS_USER.format(
@@ -308,13 +462,14 @@ async def run_synthesis(session_id: str, lock: asyncio.Lock):
     result = await llm_client.call_model("claude", system, user)
 
     # Save synthesis
-    session_store.save_markdown(session_id, "synthesis.md",
-        f"# Synthesis — Stage {state.stage}\n\n"
-        f"*{datetime.now().strftime('%Y-%m-%d %H:%M')}*\n\n"
-        + _session_header(state) + "\n---\n\n"
-        + _notes_section(state)
-        + f"{result.text}\n"
-    )
+    md = _MdWriter(f"# Synthesis — Stage {state.stage}\n\n"
+                   f"*{datetime.now().strftime('%Y-%m-%d %H:%M')}*\n\n")
+    md.write(_session_header(state))
+    md.hr()
+    md.write(_notes_section(state))
+    md.write(f"{result.text}\n")
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(session_store.save_markdown, session_id, "synthesis.md", md)
 
     # Record as response
     response = RoundResponse(
@@ -327,7 +482,14 @@ async def run_synthesis(session_id: str, lock: asyncio.Lock):
         latency_ms=result.latency_ms,
         error=result.error,
     )
-    async with lock:
-        session_store.append_response(session_id, response)
-
-    session_store.update_status(session_id, "complete")
+    # One save for the response, the summaries["synthesis"] copy (so importers needn't scan
+    # responses for it) and the final status
+    def finish():
+        with session_store.open_session(session_id) as s:
+            s.add_response(response)
+            if not result.error:
+                s.summaries["synthesis"] = result.text
+            s.status = "complete"
+
+    async with get_lock(session_id).write():
+        await asyncio.to_thread(finish)
@@ -1,16 +1,23 @@
 """Unified OpenAI-compatible async LLM client for all brainstorm models."""
 
 import asyncio
+import dataclasses
+import hashlib
 import os
-import re
+import random
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Optional
 
+import httpx
 import openai
 from dotenv import load_dotenv
 from pathlib import Path
 
+from . import prompts
+from .response_cache import ResponseCache
+
 # Load .env from project root, then optionally a second file (ENV_FILE)
 _project_env = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(_project_env)  # Load project .env first
@@ -31,7 +38,11 @@ class LLMResponse:
 
 # Model registry — all use OpenAI-compatible endpoints
 # Each model can be overridden via environment variables:
-#   {NAME}_MODEL_ID, {NAME}_BASE_URL, {NAME}_API_KEY, {NAME}_MAX_TOKENS
+#   {NAME}_MODEL_ID, {NAME}_BASE_URL, {NAME}_API_KEY, {NAME}_MAX_TOKENS,
+#   {NAME}_MAX_CONCURRENCY (in-flight calls per provider, default 8),
+#   {NAME}_TIMEOUT (overall seconds per call, streaming and retries included, default 600),
+#   {NAME}_CACHE_CONTROL=1 (mark the static system prompt with cache_control; only for endpoints
+#   that accept content blocks with it, e.g. OpenRouter or DashScope — default off)
 #
 # Global fallbacks (for single-provider setups like OpenRouter / Copilot):
 #   BRAINSTORM_BASE_URL — used when {NAME}_BASE_URL is not set
@@ -50,6 +61,9 @@ def _model_config(name: str, default_model_id: str, default_base_url: str,
         "api_key": os.getenv(f"{prefix}_API_KEY",
                              _global_api_key or os.getenv(default_api_key_env, "")),
         "max_tokens": int(os.getenv(f"{prefix}_MAX_TOKENS", str(default_max_tokens))),
+        "max_concurrency": int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "8")),
+        "timeout_s": float(os.getenv(f"{prefix}_TIMEOUT", "600")),
+        "cache_control": os.getenv(f"{prefix}_CACHE_CONTROL", "") == "1",
     }
     if extra_kwargs:
         config["extra_kwargs"] = extra_kwargs
@@ -84,63 +98,294 @@ MODELS = {
     ),
 }
 
-# Per-provider semaphores for rate limiting
-_semaphores: dict[str, asyncio.Semaphore] = {}
+
+def _partial_tag_len(text: str, tag: str) -> int:
+    """Length of the longest proper prefix of ``tag`` that ``text`` ends with."""
+    for k in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:k]):
+            return k
+    return 0
+
+
+class _ThinkStripper:
+    """Drop <think>...</think> blocks (and the whitespace after them) from a streamed completion.
+
+    MiniMax M2.5 thinking mode leaks these into the content. Equivalent to
+    ``re.sub(r"<think>.*?</think>\\s*", "", text, flags=re.DOTALL)`` over the joined text,
+    but only the few characters around a chunk boundary are ever rescanned.
+    """
+
+    _OPEN = "<think>"
+    _CLOSE = "</think>"
+
+    def __init__(self):
+        self._in_think = False
+        self._skip_ws = False
+        self._pending = ""       # possible partial "<think>" held back from the last chunk
+        self._think: list[str] = []  # current think block, kept in case it is never closed
+        self._tail = ""          # last few chars of the think block, to spot a split "</think>"
+
+    def feed(self, chunk: str) -> str:
+        """Consume a content delta and return the part of it that is visible output."""
+        out = []
+        text = self._pending + chunk
+        self._pending = ""
+        while text:
+            if self._in_think:
+                combined = self._tail + text
+                end = combined.find(self._CLOSE)
+                if end < 0:
+                    self._think.append(text)
+                    self._tail = combined[-(len(self._CLOSE) - 1):]
+                    break
+                text = combined[end + len(self._CLOSE):]
+                self._in_think = False
+                self._skip_ws = True
+                self._think.clear()
+                self._tail = ""
+                continue
+            if self._skip_ws:
+                text = text.lstrip()
+                if not text:
+                    break
+                self._skip_ws = False
+            start = text.find(self._OPEN)
+            if start < 0:
+                keep = _partial_tag_len(text, self._OPEN)
+                out.append(text[:len(text) - keep])
+                self._pending = text[len(text) - keep:]
+                break
+            out.append(text[:start])
+            text = text[start + len(self._OPEN):]
+            self._in_think = True
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Return any held-back text at end of stream (an unclosed <think> is kept verbatim)."""
+        if self._in_think:
+            return self._OPEN + "".join(self._think)
+        return self._pending
+
+
+# Per-provider semaphores for rate limiting, created up front so there is no lazy-insert race
+_semaphores: dict[str, asyncio.Semaphore] = {
+    name: asyncio.Semaphore(config["max_concurrency"]) for name, config in MODELS.items()
+}
 
 
 def _get_semaphore(name: str) -> asyncio.Semaphore:
-    if name not in _semaphores:
-        _semaphores[name] = asyncio.Semaphore(3)
     return _semaphores[name]
 
 
-async def call_model(model_name: str, system: str, user: str) -> LLMResponse:
-    """Call a model using its OpenAI-compatible endpoint."""
+# One client per provider so connection pools, TLS sessions and DNS lookups are reused
+_clients: dict[str, openai.AsyncOpenAI] = {}
+
+
+def _get_client(name: str) -> openai.AsyncOpenAI:
+    if name not in _clients:
+        config = MODELS[name]
+        _clients[name] = openai.AsyncOpenAI(
+            api_key=config["api_key"],
+            base_url=config["base_url"],
+            max_retries=0,   # retries are handled in call_model, outside the semaphore
+            timeout=120.0,   # per connect/read; a hung socket frees its slot within two minutes
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            ),
+        )
+    return _clients[name]
+
+
+async def close_clients() -> None:
+    """Close all cached provider clients and the response cache (call on app shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+    if _disk_cache is not None:
+        _disk_cache.close()
+
+
+async def _stream_completion(client: openai.AsyncOpenAI, kwargs: dict,
+                             on_text: Optional[Callable[[str], None]]) -> tuple[str, object]:
+    """Run a streaming chat completion; return the joined content (<think> blocks stripped)
+    and the usage block (if any)."""
+    stream = await client.chat.completions.create(**kwargs)
+
+    chunks = []
+    usage = None
+    think = _ThinkStripper()
+    async for chunk in stream:
+        # With include_usage the final chunk carries usage and no choices
+        if chunk.usage:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            visible = think.feed(delta)
+            if visible:
+                chunks.append(visible)
+                if on_text:
+                    on_text(visible)
+
+    rest = think.flush()
+    if rest:
+        chunks.append(rest)
+        if on_text:
+            on_text(rest)
+
+    return "".join(chunks), usage
+
+
+# Per-provider circuit breaker: after _BREAKER_THRESHOLD consecutive failures, calls to that
+# provider fail fast for _BREAKER_COOLDOWN_S instead of tying up semaphore slots.
+_BREAKER_THRESHOLD = 5
+_BREAKER_COOLDOWN_S = 60.0
+_breaker: dict[str, dict] = {name: {"failures": 0, "opened_at": 0.0} for name in MODELS}
+
+# Transient errors worth retrying (APITimeoutError is an APIConnectionError)
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+_MAX_ATTEMPTS = 3
+
+
+def _breaker_open(name: str) -> bool:
+    b = _breaker[name]
+    return b["failures"] >= _BREAKER_THRESHOLD and time.monotonic() - b["opened_at"] < _BREAKER_COOLDOWN_S
+
+
+def _record_outcome(name: str, ok: bool) -> None:
+    b = _breaker[name]
+    if ok:
+        b["failures"] = 0
+        return
+    b["failures"] += 1
+    if b["failures"] >= _BREAKER_THRESHOLD:
+        b["opened_at"] = time.monotonic()
+
+
+# Opt-in cache of identical (model, system, user) calls, e.g. two positions on the same model.
+# Off by default because debate rounds usually want independent samples.
+_DEDUP_CACHE = os.getenv("BRAINSTORM_DEDUP_CACHE", "") == "1"
+_RESP_CACHE_MAX = 32
+_resp_cache: "OrderedDict[tuple, LLMResponse]" = OrderedDict()
+# Keys with a call in flight; resolved (with no value) when it finishes, so identical calls
+# started together wait for the first instead of all hitting the API
+_inflight: dict[tuple, asyncio.Future] = {}
+
+
+# Opt-in on-disk cache (BRAINSTORM_RESPONSE_CACHE=/path/to/cache.sqlite) that survives restarts,
+# so re-running a round with unchanged prompts costs no API calls. Successful responses only.
+_RESPONSE_CACHE_PATH = os.getenv("BRAINSTORM_RESPONSE_CACHE", "")
+_disk_cache = ResponseCache(_RESPONSE_CACHE_PATH) if _RESPONSE_CACHE_PATH else None
+
+
+def _cache_key(model_id: str, system: str, user: str) -> tuple:
+    return (
+        model_id,
+        hashlib.blake2b(system.encode(), digest_size=16).digest(),
+        hashlib.blake2b(user.encode(), digest_size=16).digest(),
+    )
+
+
+async def call_model(model_name: str, system: str, user: str,
+                     on_text: Optional[Callable[[str], None]] = None) -> LLMResponse:
+    """Call a model using its OpenAI-compatible endpoint.
+
+    The completion is streamed; ``on_text`` (if given) receives each content delta as it arrives
+    (a retried attempt streams again from the start). Transient errors are retried with jittered
+    exponential backoff; a provider that keeps failing is short-circuited by a circuit breaker.
+    """
+    if not _DEDUP_CACHE:
+        return await _call_model(model_name, system, user, on_text)
+
+    key = _cache_key(MODELS[model_name]["model_id"], system, user)
+    while True:
+        if key in _resp_cache:
+            _resp_cache.move_to_end(key)
+            hit = dataclasses.replace(_resp_cache[key], latency_ms=0.0)
+            if on_text and hit.text:
+                on_text(hit.text)
+            return hit
+        pending = _inflight.get(key)
+        if pending is None:
+            break
+        # Shielded so a cancelled waiter doesn't cancel the future other callers share. If the
+        # first call failed, its key is neither cached nor in flight and we make our own.
+        await asyncio.shield(pending)
+
+    done = asyncio.get_running_loop().create_future()
+    _inflight[key] = done
+    try:
+        result = await _call_model(model_name, system, user, on_text)
+    finally:
+        del _inflight[key]
+        done.set_result(None)
+    if result.error is None:
+        _resp_cache[key] = result
+        if len(_resp_cache) > _RESP_CACHE_MAX:
+            _resp_cache.popitem(last=False)
+    return result
+
+
+async def _call_model(model_name: str, system: str, user: str,
+                      on_text: Optional[Callable[[str], None]]) -> LLMResponse:
+    """call_model without the in-process dedup cache."""
     config = MODELS[model_name]
     sem = _get_semaphore(model_name)
 
-    async with sem:
-        t0 = time.monotonic()
-        try:
-            client = openai.AsyncOpenAI(
-                api_key=config["api_key"],
-                base_url=config["base_url"],
-                max_retries=2,
-                timeout=600.0,
-            )
+    disk_key = ResponseCache.key(config["model_id"], system, user) if _disk_cache else None
+    if disk_key is not None:
+        cached = await asyncio.to_thread(_disk_cache.get, disk_key)
+        if cached is not None:
+            text, tokens_in, tokens_out = cached
+            if on_text and text:
+                on_text(text)
+            return LLMResponse(text=text, model=config["model_id"], tokens_in=tokens_in,
+                               tokens_out=tokens_out, latency_ms=0.0)
 
-            kwargs = {
-                "model": config["model_id"],
-                "messages": [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-                "temperature": 0.8,
-            }
-
-            # Gemini needs max_completion_tokens instead of max_tokens
-            if "extra_kwargs" in config:
-                kwargs.update(config["extra_kwargs"])
-            else:
-                kwargs["max_tokens"] = config["max_tokens"]
-
-            resp = await client.chat.completions.create(**kwargs)
-
-            text = resp.choices[0].message.content or ""
-            # Strip <think>...</think> tags (MiniMax M2.5 thinking mode leaks these)
-            text = re.sub(r"<think>.*?</think>\s*", "", text, flags=re.DOTALL)
-            usage = resp.usage
-            latency = (time.monotonic() - t0) * 1000
+    if _breaker_open(model_name):
+        return LLMResponse(text="", model=config["model_id"], tokens_in=0, tokens_out=0,
+                           latency_ms=0.0, error="circuit_open")
 
-            return LLMResponse(
-                text=text,
-                model=config["model_id"],
-                tokens_in=usage.prompt_tokens if usage else 0,
-                tokens_out=usage.completion_tokens if usage else 0,
-                latency_ms=latency,
-            )
+    kwargs = {
+        "model": config["model_id"],
+        "messages": prompts.build_cacheable_messages(system, user) if config["cache_control"] else [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "temperature": 0.8,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
 
+    # Gemini needs max_completion_tokens instead of max_tokens
+    if "extra_kwargs" in config:
+        kwargs.update(config["extra_kwargs"])
+    else:
+        kwargs["max_tokens"] = config["max_tokens"]
+
+    t0 = time.monotonic()
+    # One deadline for the whole call, retries and backoff included, so a provider that keeps
+    # the stream open (or keeps failing slowly) can't stall the round past timeout_s
+    deadline = t0 + config["timeout_s"]
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            async with sem:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                client = _get_client(model_name)
+                text, usage = await asyncio.wait_for(
+                    _stream_completion(client, kwargs, on_text), timeout=remaining)
+            break
         except Exception as e:
+            delay = min(2 ** attempt + random.random(), 10)
+            if (isinstance(e, _RETRYABLE) and attempt < _MAX_ATTEMPTS - 1
+                    and time.monotonic() + delay < deadline):
+                # Back off outside the semaphore so other calls can use the slot
+                await asyncio.sleep(delay)
+                continue
+            _record_outcome(model_name, ok=False)
             latency = (time.monotonic() - t0) * 1000
             return LLMResponse(
                 text="",
@@ -148,5 +393,19 @@ async def call_model(model_name: str, system: str, user: str) -> LLMResponse:
                 tokens_in=0,
                 tokens_out=0,
                 latency_ms=latency,
-                error=str(e),
+                error=str(e) or type(e).__name__,  # e.g. TimeoutError has an empty message
             )
+
+    _record_outcome(model_name, ok=True)
+    latency = (time.monotonic() - t0) * 1000
+    result = LLMResponse(
+        text=text,
+        model=config["model_id"],
+        tokens_in=usage.prompt_tokens if usage else 0,
+        tokens_out=usage.completion_tokens if usage else 0,
+        latency_ms=latency,
+    )
+    if disk_key is not None and text:
+        await asyncio.to_thread(_disk_cache.put, disk_key, config["model_id"], text,
+                                result.tokens_in, result.tokens_out)
+    return result
@@ -1,32 +1,30 @@
 """FastAPI brainstorm web app."""
 
 import asyncio
+import functools
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
-from . import debate_engine, session_store
-from .models import UserNote
+from . import debate_engine, llm_client, session_store
+from .models import SessionImportView, UserNote
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 app = FastAPI(title="Brainstorm")
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
 templates = Jinja2Templates(directory=BASE_DIR / "templates")
 
-# Per-session locks for atomic state updates
-_session_locks: dict[str, asyncio.Lock] = {}
-
-
-def get_lock(session_id: str) -> asyncio.Lock:
-    if session_id not in _session_locks:
-        _session_locks[session_id] = asyncio.Lock()
-    return _session_locks[session_id]
 
+@app.on_event("shutdown")
+async def _close_llm_clients():
+    await llm_client.close_clients()
 
 # ── Request schemas ──────────────────────────────────────────────────────────
 
@@ -65,66 +63,119 @@ async def index(request: Request):
 # Override via BRAINSTORM_ALLOWED_DIRS env var (colon-separated paths).
 _default_allowed = [str(BASE_DIR)]
 _env_dirs = os.environ.get("BRAINSTORM_ALLOWED_DIRS", "")
-ALLOWED_DIRS = [d for d in _env_dirs.split(":") if d] if _env_dirs else _default_allowed
+ALLOWED_DIRS = [os.path.normpath(d) for d in _env_dirs.split(":") if d] if _env_dirs else _default_allowed
+# Trailing separator so /home/foo doesn't admit /home/foobar; a tuple so one startswith call checks all
+_ALLOWED_PREFIXES = tuple(d.rstrip(os.sep) + os.sep for d in ALLOWED_DIRS)
 ALLOWED_EXTENSIONS = {".md", ".txt", ".csv", ".json", ".py", ".tex", ".bib"}
 
 
+def _in_allowed_dir(p: Path) -> bool:
+    """True if resolved path ``p`` is one of the allowed dirs or lies beneath one."""
+    return (str(p) + os.sep).startswith(_ALLOWED_PREFIXES)
+
+
+# Truncated file contents by resolved path, valid while (mtime_ns, size) is unchanged
+_FILE_CACHE_MAX = 64
+_MAX_FILE_CHARS = 50000
+_file_cache: "OrderedDict[str, tuple[tuple[int, int], str]]" = OrderedDict()
+_file_cache_lock = threading.Lock()  # build_background reads files on several worker threads
+
+
 def read_local_file(filepath: str) -> str:
     """Read a local file if it's in an allowed directory and has allowed extension."""
     p = Path(filepath).resolve()
-    if not any(str(p).startswith(d) for d in ALLOWED_DIRS):
+    if not _in_allowed_dir(p):
         raise ValueError(f"File not in allowed directory: {filepath}")
     if p.suffix.lower() not in ALLOWED_EXTENSIONS:
         raise ValueError(f"File type not allowed: {p.suffix}")
-    if not p.exists():
+    try:
+        st = p.stat()
+    except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {filepath}")
-    content = p.read_text(encoding="utf-8", errors="replace")
-    # Truncate very large files
-    if len(content) > 50000:
-        content = content[:50000] + "\n\n[... truncated at 50,000 characters ...]"
+
+    key = str(p)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _file_cache_lock:
+        cached = _file_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            _file_cache.move_to_end(key)
+            return cached[1]
+
+    # Truncate very large files. Read only what can decode to just past the limit (UTF-8 is at
+    # most 4 bytes per char) rather than the whole file; a char split at the cut lands past it.
+    with p.open("rb") as f:
+        raw = f.read(4 * _MAX_FILE_CHARS + 4)
+    content = raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+    if len(content) > _MAX_FILE_CHARS:
+        content = content[:_MAX_FILE_CHARS] + "\n\n[... truncated at 50,000 characters ...]"
+    with _file_cache_lock:
+        _file_cache[key] = (stamp, content)
+        _file_cache.move_to_end(key)
+        while len(_file_cache) > _FILE_CACHE_MAX:
+            _file_cache.popitem(last=False)
     return content
 
 
-def build_background(
+async def _file_part(fpath: str) -> str:
+    """Read one background file off the event loop and format it as a context section."""
+    try:
+        content = await asyncio.to_thread(read_local_file, fpath)
+        return f"## File: {Path(fpath).name}\n\n```\n{content}\n```"
+    except Exception as e:
+        return f"## File: {fpath}\n\n(Error reading: {e})"
+
+
+def _import_section(session_id: str) -> str:
+    """Context section carrying a previous session's idea and synthesis (or its summaries)."""
+    mtime_ns = (session_store.SESSIONS_DIR / session_id / "session.json").stat().st_mtime_ns
+    return _import_section_at(session_id, mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _import_section_at(session_id: str, mtime_ns: int) -> str:
+    """_import_section for one version of session.json; the mtime in the key invalidates it."""
+    prev = session_store.load_view(session_id, SessionImportView)
+    import_parts = [f"## Previous Brainstorm: {prev.title}\n\n### Original Idea\n\n{prev.idea}"]
+
+    # Import synthesis if available. Sessions synthesized before it was stored in summaries
+    # only have it as a response, which needs the full load.
+    synth = prev.summaries.get("synthesis", "")
+    if not synth:
+        synth_responses = session_store.load_session(session_id).responses_for("synthesis")
+        if synth_responses:
+            synth = synth_responses[-1].text
+    if synth:
+        import_parts.append(f"### Synthesis\n\n{synth}")
+
+    # If no synthesis, import all available summaries. Insertion order is the order the rounds
+    # ran in (r1, debate_1, roundtable_2, ...); sorting would also put debate_10 before debate_2.
+    if not synth:
+        for key, summary in prev.summaries.items():
+            import_parts.append(f"### {key.replace('_', ' ').title()} Summary\n\n{summary}")
+
+    return "\n\n".join(import_parts)
+
+
+async def build_background(
     text: str = "",
     files: list[str] = None,
     import_session_id: str = "",
 ) -> str:
     """Build background context from text, files, and/or previous session."""
+    if not (text.strip() or files or import_session_id):
+        return ""
     parts = []
 
     if text.strip():
         parts.append(f"## Background Context\n\n{text.strip()}")
 
     if files:
-        for fpath in files:
-            try:
-                content = read_local_file(fpath)
-                fname = Path(fpath).name
-                parts.append(f"## File: {fname}\n\n```\n{content}\n```")
-            except Exception as e:
-                parts.append(f"## File: {fpath}\n\n(Error reading: {e})")
+        # Read concurrently in worker threads; gather keeps the sections in request order
+        parts.extend(await asyncio.gather(*(_file_part(f) for f in files)))
 
     if import_session_id:
         try:
-            prev = session_store.load_session(import_session_id)
-            import_parts = [f"## Previous Brainstorm: {prev.title}\n\n### Original Idea\n\n{prev.idea}"]
-
-            # Import synthesis if available
-            synth = prev.summaries.get("synthesis", "")
-            if not synth:
-                synth_responses = [r for r in prev.responses if r.phase == "synthesis"]
-                if synth_responses:
-                    synth = synth_responses[-1].text
-            if synth:
-                import_parts.append(f"### Synthesis\n\n{synth}")
-
-            # If no synthesis, import all available summaries
-            if not synth:
-                for key, summary in sorted(prev.summaries.items()):
-                    import_parts.append(f"### {key.replace('_', ' ').title()} Summary\n\n{summary}")
-
-            parts.append("\n\n".join(import_parts))
+            parts.append(await asyncio.to_thread(_import_section, import_session_id))
         except Exception as e:
             parts.append(f"## Import Error\n\n(Could not import session {import_session_id}: {e})")
 
@@ -135,12 +186,13 @@ def build_background(
 
 @app.get("/api/sessions")
 async def api_list_sessions():
-    return session_store.list_sessions()
+    # Plain dicts of str/int: skip FastAPI's jsonable_encoder pass
+    return JSONResponse(session_store.list_sessions())
 
 
 @app.post("/api/sessions")
 async def api_create_session(req: CreateSessionRequest):
-    background = build_background(
+    background = await build_background(
         text=req.background,
         files=req.background_files,
         import_session_id=req.import_session,
@@ -154,26 +206,37 @@ async def api_create_session(req: CreateSessionRequest):
 async def api_get_session(session_id: str):
     try:
         state = session_store.load_session(session_id)
-        return state.model_dump()
+        # Serialize straight to JSON bytes in pydantic-core instead of dict -> jsonable_encoder -> json
+        return Response(content=state.model_dump_json(), media_type="application/json")
     except FileNotFoundError:
         raise HTTPException(404, "Session not found")
 
 
 @app.get("/api/sessions/{session_id}/status")
-async def api_session_status(session_id: str):
-    """Lightweight status endpoint for polling."""
+async def api_session_status(session_id: str, wait: float = 0, since: int = -1):
+    """Lightweight status endpoint for polling.
+
+    Long-poll: if ``since`` equals the current version, wait up to ``wait`` seconds (max 60)
+    for the session to change before answering.
+    """
     try:
-        state = session_store.load_session(session_id)
-        phase_counts = {}
-        for r in state.responses:
-            phase_counts[r.phase] = phase_counts.get(r.phase, 0) + 1
+        lock = debate_engine.get_lock(session_id)  # held so the weakly-registered lock outlives the wait
+        changed = lock.changed_event()
+        state = session_store.load_status(session_id)
+        if wait > 0 and state.version == since:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(wait, 60))
+            except asyncio.TimeoutError:
+                pass
+            state = session_store.load_status(session_id)
 
         return {
             "status": state.status,
+            "version": state.version,
             "stage": state.stage,
             "current_round": state.current_round,
-            "phase_counts": phase_counts,
-            "total_responses": len(state.responses),
+            "phase_counts": state.phase_counts,
+            "total_responses": sum(state.phase_counts.values()),
             "has_summaries": list(state.summaries.keys()),
         }
     except FileNotFoundError:
@@ -182,7 +245,7 @@ async def api_session_status(session_id: str):
 
 @app.post("/api/sessions/{session_id}/run/{phase}")
 async def api_run_phase(session_id: str, phase: str):
-    """Trigger a round. Returns 202 immediately; frontend polls status.
+    """Trigger a round. Returns 202 immediately; frontend long-polls status.
 
     Phases:
     - r1: neutral discussion (only once per stage)
@@ -194,29 +257,27 @@ async def api_run_phase(session_id: str, phase: str):
     except FileNotFoundError:
         raise HTTPException(404, "Session not found")
 
-    lock = get_lock(session_id)
-
     if phase == "r1":
         if state.status not in ("new",):
             raise HTTPException(400, f"Cannot run r1 from status {state.status}")
-        asyncio.create_task(debate_engine.run_round1(session_id, lock))
+        asyncio.create_task(debate_engine.run_round1(session_id))
 
     elif phase == "debate":
         # Can run from r1_pause or any debate/roundtable pause
         if not (state.status == "r1_pause" or state.status.endswith("_pause")):
             raise HTTPException(400, f"Cannot run debate from status {state.status}")
-        asyncio.create_task(debate_engine.run_debate_round(session_id, lock))
+        asyncio.create_task(debate_engine.run_debate_round(session_id))
 
     elif phase == "roundtable":
         # Collaborative discussion — same entry conditions as debate
         if not (state.status == "r1_pause" or state.status.endswith("_pause")):
             raise HTTPException(400, f"Cannot run roundtable from status {state.status}")
-        asyncio.create_task(debate_engine.run_roundtable(session_id, lock))
+        asyncio.create_task(debate_engine.run_roundtable(session_id))
 
     elif phase == "synthesis":
         if not state.status.endswith("_pause"):
             raise HTTPException(400, f"Cannot synthesize from status {state.status}")
-        asyncio.create_task(debate_engine.run_synthesis(session_id, lock))
+        asyncio.create_task(debate_engine.run_synthesis(session_id))
 
     else:
         raise HTTPException(400, f"Unknown phase: {phase}. Use r1, debate, or synthesis.")
@@ -226,34 +287,38 @@ async def api_run_phase(session_id: str, phase: str):
 
 @app.post("/api/sessions/{session_id}/notes")
 async def api_add_note(session_id: str, req: AddNoteRequest):
-    try:
-        state = session_store.load_session(session_id)
-    except FileNotFoundError:
-        raise HTTPException(404, "Session not found")
-
-    note = UserNote(
-        stage=state.stage,
-        after_phase=state.status.replace("_pause", ""),
-        text=req.text,
-    )
-    session_store.append_note(session_id, note)
+    # Rounds write session.json from worker threads; hold the lock across read-modify-write
+    async with debate_engine.get_lock(session_id).write():
+        try:
+            state = session_store.load_session(session_id)
+        except FileNotFoundError:
+            raise HTTPException(404, "Session not found")
+
+        note = UserNote(
+            stage=state.stage,
+            after_phase=state.status.replace("_pause", ""),
+            text=req.text,
+        )
+        await asyncio.to_thread(session_store.append_note, session_id, note)
     return {"status": "added"}
 
 
 @app.post("/api/sessions/{session_id}/context")
 async def api_add_context(session_id: str, req: AddContextRequest):
     """Add additional context (text or files) to an existing session."""
-    try:
-        state = session_store.load_session(session_id)
-    except FileNotFoundError:
-        raise HTTPException(404, "Session not found")
-
-    new_context = build_background(text=req.text, files=req.files)
-    if state.background:
-        state.background += "\n\n---\n\n" + new_context
-    else:
-        state.background = new_context
-    session_store.save_session(state)
+    new_context = await build_background(text=req.text, files=req.files)
+    async with debate_engine.get_lock(session_id).write():
+        try:
+            state = session_store.load_session(session_id)
+        except FileNotFoundError:
+            raise HTTPException(404, "Session not found")
+
+        if new_context:
+            if state.background:
+                state.background += "\n\n---\n\n" + new_context
+            else:
+                state.background = new_context
+            await asyncio.to_thread(session_store.save_session, state)
     return {"status": "context_added", "background_length": len(state.background)}
 
 
@@ -264,41 +329,42 @@ class UpdateInstructionsRequest(BaseModel):
 @app.post("/api/sessions/{session_id}/instructions")
 async def api_update_instructions(session_id: str, req: UpdateInstructionsRequest):
     """Update session instructions mid-session."""
-    try:
-        state = session_store.load_session(session_id)
-    except FileNotFoundError:
-        raise HTTPException(404, "Session not found")
-
-    state.instructions = req.instructions
-    session_store.save_session(state)
+    async with debate_engine.get_lock(session_id).write():
+        try:
+            await asyncio.to_thread(session_store.patch_session, session_id, instructions=req.instructions)
+        except FileNotFoundError:
+            raise HTTPException(404, "Session not found")
     return {"status": "updated"}
 
 
 @app.post("/api/sessions/{session_id}/new-stage")
 async def api_new_stage(session_id: str):
     """Start a new stage (repeat the cycle with accumulated context)."""
-    try:
-        state = session_store.load_session(session_id)
-    except FileNotFoundError:
-        raise HTTPException(404, "Session not found")
+    async with debate_engine.get_lock(session_id).write():
+        try:
+            state = session_store.load_status(session_id)
+        except FileNotFoundError:
+            raise HTTPException(404, "Session not found")
 
-    if state.status != "complete":
-        raise HTTPException(400, "Session must be complete to start new stage")
+        if state.status != "complete":
+            raise HTTPException(400, "Session must be complete to start new stage")
 
-    state.stage += 1
-    state.current_round = 0
-    state.status = "new"
-    session_store.save_session(state)
-    return {"status": "new_stage", "stage": state.stage}
+        stage = state.stage + 1
+        await asyncio.to_thread(
+            session_store.patch_session, session_id, stage=stage, current_round=0, status="new",
+        )
+    return {"status": "new_stage", "stage": stage}
 
 
 @app.get("/api/sessions/{session_id}/files/{filename}")
 async def api_get_file(session_id: str, filename: str):
     """Get a markdown file from the session directory."""
     path = session_store.SESSIONS_DIR / session_id / filename
-    if not path.exists():
+    if not path.is_file():
         raise HTTPException(404, "File not found")
-    return {"content": path.read_text(encoding="utf-8")}
+    # Served as-is: no JSON escaping of the body, sendfile where available, and ETag /
+    # Last-Modified headers so clients can revalidate instead of re-downloading
+    return FileResponse(path, media_type="text/markdown; charset=utf-8")
 
 
 @app.post("/api/local-files")
@@ -309,20 +375,23 @@ async def api_list_local_files(req: dict):
         return {"files": [], "dirs": list(ALLOWED_DIRS)}
 
     p = Path(dirpath).resolve()
-    if not any(str(p).startswith(d) for d in ALLOWED_DIRS):
+    if not _in_allowed_dir(p):
         raise HTTPException(403, "Directory not in allowed list")
     if not p.is_dir():
         raise HTTPException(404, "Not a directory")
 
     items = []
     try:
-        for child in sorted(p.iterdir()):
-            if child.name.startswith("."):
+        # DirEntry carries the file type from readdir, so is_dir() needs no extra stat per child
+        with os.scandir(p) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            if entry.name.startswith("."):
                 continue
-            if child.is_dir():
-                items.append({"name": child.name, "type": "dir", "path": str(child)})
-            elif child.suffix.lower() in ALLOWED_EXTENSIONS:
-                items.append({"name": child.name, "type": "file", "path": str(child)})
+            if entry.is_dir():
+                items.append({"name": entry.name, "type": "dir", "path": entry.path})
+            elif os.path.splitext(entry.name)[1].lower() in ALLOWED_EXTENSIONS:
+                items.append({"name": entry.name, "type": "file", "path": entry.path})
     except PermissionError:
         pass
 
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
 
 
 class ModelConfig(BaseModel):
@@ -56,7 +56,61 @@ class SessionState(BaseModel):
     status: str = "new"     # state machine value
     stage: int = 1
     current_round: int = 0  # 0=not started, 1=r1 done, 2=first attack/defense done, etc.
+    version: int = 0        # bumped on every state change; lets status pollers wait for changes
     positions: list[PositionAssignment] = Field(default_factory=list)
     responses: list[RoundResponse] = Field(default_factory=list)
     summaries: dict[str, str] = Field(default_factory=dict)  # {"r1": "...", "r2": "..."}
     user_notes: list[UserNote] = Field(default_factory=list)
+
+    # Phase -> responses index, rebuilt on load and kept in sync by add_response (not serialized)
+    _responses_by_phase: dict[str, list[RoundResponse]] = PrivateAttr(default_factory=dict)
+    # (phase, render) -> rendered text, dropped when a response for that phase is added (not serialized)
+    _phase_blocks: dict[tuple, str] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        for r in self.responses:
+            self._responses_by_phase.setdefault(r.phase, []).append(r)
+
+    def add_response(self, response: RoundResponse) -> None:
+        """Append a response and index it by phase."""
+        self.responses.append(response)
+        self._responses_by_phase.setdefault(response.phase, []).append(response)
+        for key in [k for k in self._phase_blocks if k[0] == response.phase]:
+            del self._phase_blocks[key]
+
+    @computed_field
+    @property
+    def phase_counts(self) -> dict[str, int]:
+        """Number of responses per phase. Serialized for readers of session.json; ignored on load."""
+        return {phase: len(rs) for phase, rs in self._responses_by_phase.items()}
+
+    def responses_for(self, *phases: str) -> list[RoundResponse]:
+        """Responses recorded for the given phases, in phase order."""
+        if len(phases) == 1:
+            return list(self._responses_by_phase.get(phases[0], ()))
+        return [r for p in phases for r in self._responses_by_phase.get(p, ())]
+
+    def phase_block(self, phase: str, render) -> str:
+        """``render(responses_for(phase))``, cached until a response for ``phase`` is added."""
+        key = (phase, render)
+        block = self._phase_blocks.get(key)
+        if block is None:
+            block = self._phase_blocks[key] = render(self.responses_for(phase))
+        return block
+
+
+class SessionStatusView(BaseModel):
+    """The slice of session.json the status endpoint reports; validating it skips the responses."""
+    status: str = "new"
+    stage: int = 1
+    current_round: int = 0
+    version: int = 0
+    phase_counts: Optional[dict[str, int]] = None  # None in files written before it was serialized
+    summaries: dict[str, str] = Field(default_factory=dict)
+
+
+class SessionImportView(BaseModel):
+    """The slice of session.json needed to import a session as background context."""
+    title: str
+    idea: str
+    summaries: dict[str, str] = Field(default_factory=dict)
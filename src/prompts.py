@@ -1,8 +1,19 @@
-"""Prompt templates for the brainstorm debate protocol."""
+"""Prompt templates for the brainstorm debate protocol.
+
+Layout is static-first so provider prompt caches can reuse the longest possible prefix: each
+role's system prompt is a ``*_SYSTEM_STATIC`` block with no fields (identical for every model,
+position and round) followed by a short ``*_SYSTEM_DYNAMIC`` assignment block, and user prompts
+put the idea and accumulated context before the per-position role line.
+"""
+
+import functools
+import io
+import threading
+from collections import OrderedDict
 
 # ── Round 1: Neutral Discussant ──────────────────────────────────────────────
 
-ROUND1_SYSTEM = """You are {model_name}, serving as a neutral academic discussant in a structured research seminar.
+ROUND1_SYSTEM_STATIC = """You are serving as a neutral academic discussant in a structured research seminar.
 
 Your task: provide a balanced, rigorous assessment of the research idea below.
 
@@ -14,6 +25,12 @@ Structure your response as:
 
 Be thorough and substantive (at least 800 words). Give specific, actionable feedback, not generic observations."""
 
+ROUND1_SYSTEM_DYNAMIC = """
+
+## Your Assignment
+
+You are {model_name}, the neutral discussant."""
+
 ROUND1_USER = """## Research Idea
 
 {idea}
@@ -22,7 +39,7 @@ ROUND1_USER = """## Research Idea
 
 # ── Attack (Round 1 debate) ──────────────────────────────────────────────────
 
-ATTACK_SYSTEM = """You are {model_name}, assigned as **{position} (OPPONENT)** in a structured academic debate.
+ATTACK_SYSTEM_STATIC = """You are an OPPONENT in a structured academic debate.
 
 Your task: identify the strongest objections to this research idea. Be incisive and specific.
 
@@ -40,17 +57,23 @@ CRITICAL RULES:
 
 (at least 800 words)"""
 
-ATTACK_USER = """## YOUR ROLE: {position} — OPPONENT (You must ATTACK this idea)
+ATTACK_SYSTEM_DYNAMIC = """
 
-## Research Idea
+## Your Assignment
+
+You are {model_name}, assigned as **{position} (OPPONENT)**."""
+
+ATTACK_USER = """## Research Idea
 
 {idea}
 
-{context}"""
+{context}
+
+## YOUR ROLE: {position} — OPPONENT (You must ATTACK this idea)"""
 
 # ── Defense (Round 1 debate) ──────────────────────────────────────────────────
 
-DEFEND_SYSTEM = """You are {model_name}, assigned as **{position} (SUPPORTER)** in a structured academic debate.
+DEFEND_SYSTEM_STATIC = """You are a SUPPORTER in a structured academic debate.
 
 The opponents have attacked the research idea below. Your task: defend it.
 
@@ -68,9 +91,15 @@ CRITICAL RULES:
 
 (at least 800 words)"""
 
-DEFEND_USER = """## YOUR ROLE: {position} — SUPPORTER (You must DEFEND this idea)
+DEFEND_SYSTEM_DYNAMIC = """
+
+## Your Assignment
 
-## Research Idea
+You are {model_name}, assigned as **{position} (SUPPORTER)**."""
+
+# Defense user prompts are split so the large shared part (attacks + context) is formatted once
+# per round and only the short role block differs between defenders.
+DEFEND_USER_HEADER = """## Research Idea
 
 {idea}
 
@@ -80,9 +109,13 @@ DEFEND_USER = """## YOUR ROLE: {position} — SUPPORTER (You must DEFEND this id
 
 {context}"""
 
+DEFEND_USER_POSITION = """
+
+## YOUR ROLE: {position} — SUPPORTER (You must DEFEND this idea)"""
+
 # ── Swap Attack (role-swapped rounds) ────────────────────────────────────────
 
-SWAP_ATTACK_SYSTEM = """You are {model_name}, assigned as **{position} (OPPONENT)** in Debate Round {round_num} of a structured debate.
+SWAP_ATTACK_SYSTEM_STATIC = """You are an OPPONENT in a role-swapped round of a structured debate.
 
 IMPORTANT: In the previous round, your position DEFENDED this idea. Now you must ATTACK it.
 Having defended it, you know its vulnerabilities better than anyone. Exploit that knowledge.
@@ -101,9 +134,15 @@ CRITICAL RULES:
 
 (at least 800 words)"""
 
+SWAP_ATTACK_SYSTEM_DYNAMIC = """
+
+## Your Assignment
+
+You are {model_name}, assigned as **{position} (OPPONENT)** in Debate Round {round_num}."""
+
 # ── Swap Defense (role-swapped rounds) ───────────────────────────────────────
 
-SWAP_DEFEND_SYSTEM = """You are {model_name}, assigned as **{position} (SUPPORTER)** in Debate Round {round_num} of a structured debate.
+SWAP_DEFEND_SYSTEM_STATIC = """You are a SUPPORTER in a role-swapped round of a structured debate.
 
 IMPORTANT: In the previous round, your position ATTACKED this idea. Now you must DEFEND it.
 Having attacked it, you know which attacks are genuinely damaging and which are superficial.
@@ -121,9 +160,13 @@ CRITICAL RULES:
 
 (at least 800 words)"""
 
-SWAP_DEFEND_USER = """## YOUR ROLE: {position} — SUPPORTER in Round {round_num} (You previously ATTACKED — now you must DEFEND)
+SWAP_DEFEND_SYSTEM_DYNAMIC = """
+
+## Your Assignment
 
-## Research Idea
+You are {model_name}, assigned as **{position} (SUPPORTER)** in Debate Round {round_num}."""
+
+SWAP_DEFEND_USER_HEADER = """## Research Idea
 
 {idea}
 
@@ -133,9 +176,13 @@ SWAP_DEFEND_USER = """## YOUR ROLE: {position} — SUPPORTER in Round {round_num
 
 {context}"""
 
+SWAP_DEFEND_USER_POSITION = """
+
+## YOUR ROLE: {position} — SUPPORTER in Round {round_num} (You previously ATTACKED — now you must DEFEND)"""
+
 # ── Roundtable (collaborative, no forced sides) ─────────────────────────────
 
-ROUNDTABLE_SYSTEM = """You are {model_name}, participating in a collaborative academic roundtable discussion (Round {round_num}).
+ROUNDTABLE_SYSTEM_STATIC = """You are participating in a collaborative academic roundtable discussion.
 
 This is NOT a debate — there are no assigned sides. You are a thoughtful colleague contributing to a group brainstorm.
 
@@ -155,13 +202,19 @@ CRITICAL RULES:
 
 (at least 800 words)"""
 
-ROUNDTABLE_USER = """## YOUR ROLE: Collaborative Roundtable Participant (Round {round_num})
+ROUNDTABLE_SYSTEM_DYNAMIC = """
+
+## Your Assignment
+
+You are {model_name}, participating in Roundtable Round {round_num}."""
 
-## Research Idea
+ROUNDTABLE_USER = """## Research Idea
 
 {idea}
 
-{context}"""
+{context}
+
+## YOUR ROLE: Collaborative Roundtable Participant (Round {round_num})"""
 
 # ── Moderator Summary ────────────────────────────────────────────────────────
 
@@ -229,6 +282,55 @@ SYNTHESIS_USER = """## Research Idea
 {user_notes}"""
 
 
+# Builders below walk every response and summary; memoize them per session state version.
+# SessionState.version is bumped on every change (save_session / record_response), so a hit is
+# always current and entries for superseded versions simply age out.
+_MEMO_MAX = 64
+
+
+def _memo_by_version(fn):
+    """Memoize ``fn(session_state, *args)`` on (session_id, version, *args)."""
+    cache: "OrderedDict[tuple, str]" = OrderedDict()
+    lock = threading.Lock()  # the engine builds transcripts on worker threads
+
+    @functools.wraps(fn)
+    def wrapper(session_state, *args):
+        key = (session_state.session_id, session_state.version, *args)
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        result = fn(session_state, *args)
+        with lock:
+            cache[key] = result
+            while len(cache) > _MEMO_MAX:
+                cache.popitem(last=False)
+        return result
+    return wrapper
+
+
+# Every *_SYSTEM_DYNAMIC block starts with this heading; everything before it is static
+_ASSIGNMENT_HEADING = "\n\n## Your Assignment\n\n"
+
+
+def build_cacheable_messages(system: str, user: str) -> list[dict]:
+    """Chat messages with the static part of ``system`` marked for provider-side prompt caching.
+
+    The role prompt and the session's instructions (everything before the trailing assignment
+    block, or the whole prompt if it has none) carry an ephemeral ``cache_control`` breakpoint;
+    the assignment and the user prompt follow as ordinary content.
+    """
+    cut = system.rfind(_ASSIGNMENT_HEADING)
+    static, dynamic = (system, "") if cut < 0 else (system[:cut], system[cut:])
+    content = [{"type": "text", "text": static, "cache_control": {"type": "ephemeral"}}]
+    if dynamic:
+        content.append({"type": "text", "text": dynamic})
+    return [
+        {"role": "system", "content": content},
+        {"role": "user", "content": user},
+    ]
+
+
 def inject_instructions(system_prompt: str, instructions: str) -> str:
     """Append user instructions to a system prompt if present."""
     if not instructions or not instructions.strip():
@@ -236,113 +338,116 @@ def inject_instructions(system_prompt: str, instructions: str) -> str:
     return system_prompt + f"\n\n## Additional Instructions from the User\n\n{instructions.strip()}"
 
 
+@_memo_by_version
 def build_context(session_state, phase: str) -> str:
     """Build accumulated context string for a given phase.
 
     Strategy: include FULL responses from the most recent round + summaries of older rounds.
     This ensures models can engage with specific arguments while keeping context manageable.
+
+    Sections are ordered from most to least stable (background, summaries, user notes, then the
+    previous round's full responses) so consecutive rounds share as long a prefix as possible.
+    Everything is written into one buffer, so response texts are copied once rather than once
+    per nested join.
     """
-    parts = []
+    buf = io.StringIO()
+
+    def section(title: str, body: str = "") -> None:
+        if buf.tell():
+            buf.write("\n\n---\n\n")
+        buf.write(title)
+        buf.write("\n\n")
+        buf.write(body)
+
+    def responses_section(title: str, responses, with_kind: bool = False) -> None:
+        section(title)
+        for i, r in enumerate(responses):
+            if i:
+                buf.write("\n\n")
+            kind = f" — {'Attack' if 'attack' in r.phase else 'Defense'}" if with_kind else ""
+            buf.write(f"### {r.position} ({r.model_name}){kind}\n\n")
+            buf.write(r.text)
+
+    summaries = session_state.summaries
+
+    # Parse current round number from phase (works for debate_N_* and roundtable_N)
+    current_debate_num = _parse_debate_num(phase)
+    current_roundtable_num = _parse_roundtable_num(phase)
+
+    # ── Stable: only grows as rounds complete ──
 
     # Always include background if present
     if session_state.background:
-        parts.append(f"## Background Context\n\n{session_state.background}")
-
-    # Always include user notes if any
-    notes = [n for n in session_state.user_notes if n.stage <= session_state.stage]
-    if notes:
-        notes_text = "\n\n".join(
-            f"**User note (after {n.after_phase}):** {n.text}" for n in notes
-        )
-        parts.append(f"## User Notes\n\n{notes_text}")
+        section("## Background Context", session_state.background)
 
     # Always include R1 summary for any debate/synthesis phase
-    if phase != "r1":
-        if "r1" in session_state.summaries:
-            parts.append(f"## Round 1 Summary\n\n{session_state.summaries['r1']}")
+    if phase != "r1" and "r1" in summaries:
+        section("## Round 1 Summary", summaries["r1"])
 
-    # Parse current round number from phase (works for debate_N_* and roundtable_N)
-    current_debate_num = _parse_debate_num(phase)
-    current_roundtable_num = _parse_roundtable_num(phase)
-    effective_round = current_debate_num or current_roundtable_num
-
-    # For roundtable: include full responses from most recent prior round (any type)
     if current_roundtable_num is not None:
-        # Find the most recent prior round's responses
-        all_round_nums = set()
-        for r in session_state.responses:
-            if r.phase == "r1":
-                all_round_nums.add(("r1", 0))
-            dn = _parse_debate_num(r.phase)
-            if dn is not None:
-                all_round_nums.add(("debate", dn))
-            rn = _parse_roundtable_num(r.phase)
-            if rn is not None and rn < current_roundtable_num:
-                all_round_nums.add(("roundtable", rn))
-
         # Include older summaries
-        for key, summary in sorted(session_state.summaries.items()):
+        for key, summary in sorted(summaries.items()):
             if key == "r1" or key.startswith("debate_") or key.startswith("roundtable_"):
-                parts.append(f"## {key.replace('_', ' ').title()} Summary\n\n{summary}")
+                section(f"## {key.replace('_', ' ').title()} Summary", summary)
+
+    if current_debate_num is not None:
+        # Older rounds: include summaries only (rounds 1 to N-2)
+        for i in range(1, max(1, current_debate_num - 1)):
+            summary_key = f"debate_{i}"
+            if summary_key in summaries:
+                section(f"## Debate Round {i} Summary", summaries[summary_key])
+
+    # For synthesis, include all debate summaries
+    if phase == "synthesis":
+        for key, summary in sorted(summaries.items()):
+            if key.startswith("debate_"):
+                section(f"## {key.replace('_', ' ').title()} Summary", summary)
+
+    # User notes grow between rounds, so they go after the summaries and before the previous round
+    notes = [n for n in session_state.user_notes if n.stage <= session_state.stage]
+    if notes:
+        section("## User Notes", "\n\n".join(
+            f"**User note (after {n.after_phase}):** {n.text}" for n in notes
+        ))
+
+    # ── Recent: the previous round's material, different every round ──
 
-        # Include full responses from the most recent prior round
+    # For roundtable: include full responses from the most recent prior round (any type)
+    if current_roundtable_num is not None:
         prev_round = current_roundtable_num - 1
         if prev_round >= 1:
             # Check debate or roundtable
-            prev_debate = [r for r in session_state.responses
-                           if r.phase in (f"debate_{prev_round}_attack", f"debate_{prev_round}_defense")
-                           and not r.error]
-            prev_rt = [r for r in session_state.responses
-                       if r.phase == f"roundtable_{prev_round}" and not r.error]
+            prev_debate = [r for r in session_state.responses_for(f"debate_{prev_round}_attack",
+                                                                  f"debate_{prev_round}_defense")
+                           if not r.error]
+            prev_rt = [r for r in session_state.responses_for(f"roundtable_{prev_round}") if not r.error]
             prev_responses = prev_debate or prev_rt
             if prev_responses:
-                prev_text = "\n\n".join(
-                    f"### {r.position} ({r.model_name})\n\n{r.text}"
-                    for r in prev_responses
-                )
-                parts.append(f"## Previous Round {prev_round} — FULL Responses (READ CAREFULLY)\n\n{prev_text}")
+                responses_section(f"## Previous Round {prev_round} — FULL Responses (READ CAREFULLY)",
+                                  prev_responses)
 
     if current_debate_num is not None:
-        # Older rounds: include summaries only (rounds 1 to N-2)
-        for i in range(1, max(1, current_debate_num - 1)):
-            summary_key = f"debate_{i}"
-            if summary_key in session_state.summaries:
-                parts.append(f"## Debate Round {i} Summary\n\n{session_state.summaries[summary_key]}")
-
         # Most recent prior round: include FULL responses (not just summary)
         # This is the key to preventing convergence — models see actual arguments
         if current_debate_num >= 2:
             prev_num = current_debate_num - 1
-            prev_responses = [r for r in session_state.responses
-                              if r.phase in (f"debate_{prev_num}_attack", f"debate_{prev_num}_defense")
-                              and not r.error]
+            prev_responses = [r for r in session_state.responses_for(f"debate_{prev_num}_attack",
+                                                                     f"debate_{prev_num}_defense")
+                              if not r.error]
             if prev_responses:
-                prev_text = "\n\n".join(
-                    f"### {r.position} ({r.model_name}) — {'Attack' if 'attack' in r.phase else 'Defense'}\n\n{r.text}"
-                    for r in prev_responses
-                )
-                parts.append(f"## Debate Round {prev_num} — FULL Responses (READ CAREFULLY)\n\n{prev_text}")
+                responses_section(f"## Debate Round {prev_num} — FULL Responses (READ CAREFULLY)",
+                                  prev_responses, with_kind=True)
             # Also include that round's summary for the "settled issues" info
             summary_key = f"debate_{prev_num}"
-            if summary_key in session_state.summaries:
-                parts.append(f"## Moderator Notes on Round {prev_num}\n\n{session_state.summaries[summary_key]}")
+            if summary_key in summaries:
+                section(f"## Moderator Notes on Round {prev_num}", summaries[summary_key])
         elif current_debate_num == 1:
             # First debate round: include full R1 responses so attackers can target specific claims
-            r1_responses = [r for r in session_state.responses if r.phase == "r1" and not r.error]
+            r1_responses = [r for r in session_state.responses_for("r1") if not r.error]
             if r1_responses:
-                r1_text = "\n\n".join(
-                    f"### {r.position} ({r.model_name})\n\n{r.text}"
-                    for r in r1_responses
-                )
-                parts.append(f"## Round 1 — FULL Responses (READ CAREFULLY)\n\n{r1_text}")
-
-    # For synthesis, include all debate summaries
-    if phase == "synthesis":
-        for key, summary in sorted(session_state.summaries.items()):
-            if key.startswith("debate_") and key not in [p.split("\n")[0] for p in parts]:
-                parts.append(f"## {key.replace('_', ' ').title()} Summary\n\n{summary}")
+                responses_section("## Round 1 — FULL Responses (READ CAREFULLY)", r1_responses)
 
-    return "\n\n---\n\n".join(parts) if parts else ""
+    return buf.getvalue()
 
 
 def _parse_debate_num(phase: str) -> int | None:
@@ -380,35 +485,43 @@ def format_responses_for_summary(responses: list) -> str:
     )
 
 
+def format_phases_for_summary(session_state, *phases: str) -> str:
+    """format_responses_for_summary over several phases, reusing each phase's rendered block.
+
+    A finished phase is rendered once: its round summary and the synthesis transcript share it.
+    """
+    blocks = (session_state.phase_block(p, format_responses_for_summary) for p in phases)
+    return "\n\n".join(b for b in blocks if b)
+
+
+@_memo_by_version
 def build_full_transcript(session_state) -> str:
     """Build the full debate transcript for synthesis."""
     parts = []
+    counts = session_state.phase_counts
 
     # Round 1
-    r1_responses = [r for r in session_state.responses if r.phase == "r1"]
-    if r1_responses:
-        parts.append(f"## Round 1: Neutral Discussion\n\n{format_responses_for_summary(r1_responses)}")
+    if counts.get("r1"):
+        parts.append(f"## Round 1: Neutral Discussion\n\n{format_phases_for_summary(session_state, 'r1')}")
     if "r1" in session_state.summaries:
         parts.append(f"**Moderator Summary (R1):** {session_state.summaries['r1']}")
 
-    # All debate rounds dynamically
-    debate_nums = set()
-    for r in session_state.responses:
-        num = _parse_debate_num(r.phase)
-        if num is not None:
-            debate_nums.add(num)
+    # All debate rounds dynamically (parse each distinct phase once, not every response)
+    debate_nums = {_parse_debate_num(phase) for phase in counts}
+    debate_nums.discard(None)
 
     for num in sorted(debate_nums):
-        attack_responses = [r for r in session_state.responses if r.phase == f"debate_{num}_attack"]
-        defense_responses = [r for r in session_state.responses if r.phase == f"debate_{num}_defense"]
+        attack_phase, defense_phase = f"debate_{num}_attack", f"debate_{num}_defense"
 
         is_swap = (num % 2 == 0)
         swap_label = " (Role Swap)" if is_swap else ""
 
-        if attack_responses:
-            parts.append(f"## Debate Round {num}: Attacks{swap_label}\n\n{format_responses_for_summary(attack_responses)}")
-        if defense_responses:
-            parts.append(f"## Debate Round {num}: Defenses{swap_label}\n\n{format_responses_for_summary(defense_responses)}")
+        if counts.get(attack_phase):
+            parts.append(f"## Debate Round {num}: Attacks{swap_label}\n\n"
+                         f"{format_phases_for_summary(session_state, attack_phase)}")
+        if counts.get(defense_phase):
+            parts.append(f"## Debate Round {num}: Defenses{swap_label}\n\n"
+                         f"{format_phases_for_summary(session_state, defense_phase)}")
 
         summary_key = f"debate_{num}"
         if summary_key in session_state.summaries:
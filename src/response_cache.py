@@ -0,0 +1,55 @@
+"""On-disk cache of LLM responses keyed by the exact prompt (opt-in, see llm_client)."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class ResponseCache:
+    """SQLite table of (prompt hash -> response text), shared by every process using the file.
+
+    Only exact matches hit: the key covers the model id, system prompt and user prompt, so a
+    re-run round with the same idea and prior context reuses the earlier answers.
+    """
+
+    def __init__(self, path: str):
+        # One connection shared by the worker threads call_model offloads to; with
+        # check_same_thread off, serializing access to it is up to us, hence the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key BLOB PRIMARY KEY, model TEXT, text TEXT,"
+                " tokens_in INTEGER, tokens_out INTEGER, created_at REAL)"
+            )
+
+    @staticmethod
+    def key(model_id: str, system: str, user: str) -> bytes:
+        h = hashlib.blake2b(digest_size=32)
+        for part in (model_id, system, user):
+            data = part.encode()
+            h.update(len(data).to_bytes(8, "little"))  # length-prefixed so parts can't run together
+            h.update(data)
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[tuple[str, int, int]]:
+        """(text, tokens_in, tokens_out) of the cached response, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT text, tokens_in, tokens_out FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def put(self, key: bytes, model_id: str, text: str, tokens_in: int, tokens_out: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_id, text, tokens_in, tokens_out, time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,11 +1,17 @@
 """File-based session state management with atomic writes."""
 
+import contextlib
 import json
+import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 
-from .models import SessionState, PositionAssignment, RoundResponse, UserNote
+from pydantic import BaseModel
+
+from .models import SessionState, SessionStatusView, PositionAssignment, RoundResponse, UserNote
 
 SESSIONS_DIR = Path("/Users/minime/research_project/brainstorm/sessions")
 
@@ -33,19 +39,201 @@ def create_session(title: str, idea: str, assignments: dict[str, str], backgroun
     return state
 
 
+# Parsed sessions keyed by session.json's mtime, so repeated loads of an unchanged session skip
+# both the file read and pydantic validation. Small LRU: a session can be several MB in memory.
+_CACHE_MAX = 32
+_session_cache: "OrderedDict[str, tuple[int, SessionState]]" = OrderedDict()
+_cache_lock = threading.Lock()  # loads and saves run on worker threads (asyncio.to_thread)
+
+
+def _cached(session_id: str, mtime_ns: int) -> SessionState | None:
+    """The cached state for this session if it was parsed from (or saved as) this mtime."""
+    with _cache_lock:
+        cached = _session_cache.get(session_id)
+        if cached is None or cached[0] != mtime_ns:
+            return None
+        _session_cache.move_to_end(session_id)
+        return cached[1]
+
+
+def _remember(session_id: str, mtime_ns: int, state: SessionState,
+              parsed: bool = False) -> SessionState:
+    """Cache ``state``; returns the canonical object for that mtime.
+
+    For a freshly ``parsed`` state, an object another thread cached for the same mtime while
+    this one was parsing wins, so callers never end up holding two copies of one session.
+    A saved state always replaces the entry.
+    """
+    with _cache_lock:
+        cached = _session_cache.get(session_id)
+        if parsed and cached is not None and cached[0] == mtime_ns:
+            state = cached[1]
+        _session_cache[session_id] = (mtime_ns, state)
+        _session_cache.move_to_end(session_id)
+        while len(_session_cache) > _CACHE_MAX:
+            _session_cache.popitem(last=False)
+        return state
+
+
+def _forget(session_id: str) -> None:
+    with _cache_lock:
+        _session_cache.pop(session_id, None)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write to a sibling .tmp then os.replace it over ``path``, so readers never see a partial file."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# Small appends (responses recorded mid-round, user notes) go to events.jsonl instead of rewriting
+# session.json; the in-memory state is updated too. Each line carries the state version it
+# produced; save_session folds everything into session.json and removes the log, and loading
+# replays only lines newer than the snapshot (a crash between the two just leaves stale lines).
+def _log_path(session_id: str) -> Path:
+    return SESSIONS_DIR / session_id / "events.jsonl"
+
+
+def _append_event(session_id: str, version: int, kind: str, data_json: str) -> None:
+    with open(_log_path(session_id), "a", encoding="utf-8") as f:
+        f.write(f'{{"v":{version},"type":"{kind}","data":{data_json}}}\n')
+
+
+def _has_events(session_id: str) -> bool:
+    try:
+        return _log_path(session_id).stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+
+def _replay_events(state: SessionState) -> None:
+    """Apply logged events newer than the snapshot ``state`` was loaded from."""
+    try:
+        data = _log_path(state.session_id).read_bytes()
+    except FileNotFoundError:
+        return
+    for line in data.splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue  # torn final line from a crash mid-append
+        if event["v"] <= state.version:
+            continue
+        if event["type"] == "response":
+            state.add_response(RoundResponse.model_validate(event["data"]))
+        elif event["type"] == "note":
+            state.user_notes.append(UserNote.model_validate(event["data"]))
+        state.version = event["v"]
+
+
+# meta.json: the few fields list_sessions shows, written alongside every snapshot so listing
+# sessions doesn't parse each (possibly multi-MB) session.json
+_META_KEYS = ("session_id", "title", "status", "stage", "created_at", "updated_at")
+_META_FIELDS = set(_META_KEYS)
+
+
+def _write_meta(session_dir: Path, meta_json: bytes) -> None:
+    _write_atomic(session_dir / "meta.json", meta_json)
+
+
 def save_session(state: SessionState) -> None:
     """Atomic write: write to .tmp then rename."""
     state.updated_at = datetime.utcnow().isoformat()
+    state.version += 1
     path = SESSIONS_DIR / state.session_id / "session.json"
-    tmp = path.with_suffix(".tmp")
-    tmp.write_text(state.model_dump_json(indent=2), encoding="utf-8")
-    tmp.rename(path)
+    # Compact: session.json is machine-read; the .md exports are the human-readable copies
+    _write_atomic(path, state.model_dump_json().encode())
+    _write_meta(path.parent, state.model_dump_json(include=_META_FIELDS).encode())
+    _log_path(state.session_id).unlink(missing_ok=True)
+    _remember(state.session_id, path.stat().st_mtime_ns, state)
+
+
+# Sessions with a round in progress are held in memory; loads and mutators share that object
+# so changes made mid-round (e.g. user notes) are visible to the engine without a re-read.
+_live_sessions: dict[str, SessionState] = {}
+
+
+def attach_live(state: SessionState) -> None:
+    """Serve ``state`` from memory for its session until detach_live is called."""
+    _live_sessions[state.session_id] = state
+
+
+def detach_live(session_id: str) -> None:
+    """Stop serving a session from memory; subsequent loads read disk again."""
+    _live_sessions.pop(session_id, None)
 
 
 def load_session(session_id: str) -> SessionState:
-    """Load session state from disk."""
+    """Load session state: the live object if a round is running, else cached or from disk."""
+    live = _live_sessions.get(session_id)
+    if live is not None:
+        return live
+    path = SESSIONS_DIR / session_id / "session.json"
+    mtime_ns = path.stat().st_mtime_ns
+    cached = _cached(session_id, mtime_ns)
+    if cached is not None:
+        return cached
+    state = SessionState.model_validate_json(path.read_bytes())
+    _replay_events(state)
+    return _remember(session_id, mtime_ns, state, parsed=True)
+
+
+def load_view(session_id: str, view: type[BaseModel]) -> BaseModel:
+    """Load a partial view of a session (a model declaring a subset of SessionState's fields).
+
+    Returns the full state when it is already in memory (live or cached), since it has every
+    field a view has; otherwise validates only the view's fields of session.json instead of
+    every response.
+    """
+    live = _live_sessions.get(session_id)
+    if live is not None:
+        return live
     path = SESSIONS_DIR / session_id / "session.json"
-    return SessionState.model_validate_json(path.read_text(encoding="utf-8"))
+    cached = _cached(session_id, path.stat().st_mtime_ns)
+    if cached is not None:
+        return cached
+    if _has_events(session_id):  # responses logged after the snapshot (crashed mid-round)
+        return load_session(session_id)
+    return view.model_validate_json(path.read_bytes())
+
+
+def load_status(session_id: str) -> SessionState | SessionStatusView:
+    """Load what a status poll needs (see load_view)."""
+    state = load_view(session_id, SessionStatusView)
+    if state.phase_counts is None:  # written before phase_counts was serialized
+        return load_session(session_id)
+    return state
+
+
+def patch_session(session_id: str, **fields) -> None:
+    """Set top-level fields of a session without loading it as a SessionState.
+
+    A session already in memory (live or cached) is patched in place and saved normally, so a
+    running round and the cache stay coherent. Otherwise the stored JSON is edited directly,
+    skipping the validation of every response that a full load would do.
+    """
+    path = SESSIONS_DIR / session_id / "session.json"
+    state = _live_sessions.get(session_id)
+    if state is None:
+        state = _cached(session_id, path.stat().st_mtime_ns)
+        # With logged events pending, the raw patch would bump version past them unreplayed
+        if state is None and _has_events(session_id):
+            state = load_session(session_id)
+    if state is not None:
+        for name, value in fields.items():
+            setattr(state, name, value)
+        save_session(state)
+        return
+
+    data = json.loads(path.read_bytes())
+    data.update(fields)
+    data["updated_at"] = datetime.utcnow().isoformat()
+    data["version"] = data.get("version", 0) + 1
+    _write_atomic(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode())
+    meta = {k: data[k] for k in _META_FIELDS if k in data}
+    _write_meta(path.parent, json.dumps(meta, ensure_ascii=False).encode())
+    _forget(session_id)
 
 
 def list_sessions() -> list[dict]:
@@ -54,59 +242,97 @@ def list_sessions() -> list[dict]:
     if not SESSIONS_DIR.exists():
         return sessions
     for d in sorted(SESSIONS_DIR.iterdir(), reverse=True):
-        json_path = d / "session.json"
-        if json_path.exists():
+        try:
+            meta = json.loads((d / "meta.json").read_bytes())
+        except FileNotFoundError:
+            # Session saved before meta.json existed: parse it once and backfill the sidecar
+            json_path = d / "session.json"
+            if not json_path.exists():
+                continue
             try:
-                state = SessionState.model_validate_json(json_path.read_text(encoding="utf-8"))
-                sessions.append({
-                    "session_id": state.session_id,
-                    "title": state.title,
-                    "status": state.status,
-                    "stage": state.stage,
-                    "created_at": state.created_at,
-                    "updated_at": state.updated_at,
-                })
+                state = SessionState.model_validate_json(json_path.read_bytes())
+                meta_json = state.model_dump_json(include=_META_FIELDS)
+                _write_meta(d, meta_json.encode())
+                meta = json.loads(meta_json)
             except Exception:
-                pass
+                continue
+        except Exception:
+            continue
+        try:
+            sessions.append({k: meta[k] for k in _META_KEYS})
+        except (KeyError, TypeError):
+            pass
     return sessions
 
 
-def update_status(session_id: str, status: str) -> None:
-    """Update session status."""
+@contextlib.contextmanager
+def open_session(session_id: str):
+    """Load a session for a batch of mutations and save it once on exit.
+
+    Nothing is saved if the body raises, and the cached object (which the body may have half
+    mutated) is dropped so the next load re-reads disk. A live session's object is the running
+    round's own state and can't be dropped; its changes stay in memory.
+    """
     state = load_session(session_id)
-    state.status = status
+    try:
+        yield state
+    except BaseException:
+        if _live_sessions.get(session_id) is not state:
+            _forget(session_id)
+        raise
     save_session(state)
 
 
+def update_status(session_id: str, status: str) -> None:
+    """Update session status."""
+    with open_session(session_id) as state:
+        state.status = status
+
+
 def append_response(session_id: str, response: RoundResponse) -> None:
     """Append a response and save atomically."""
+    with open_session(session_id) as state:
+        state.add_response(response)
+
+
+def record_response(session_id: str, response: RoundResponse) -> None:
+    """Append a response in memory and to the event log; session.json catches up on the next save.
+
+    Only meaningful while the session is attached via attach_live (i.e. during a round).
+    """
     state = load_session(session_id)
-    state.responses.append(response)
-    save_session(state)
+    state.add_response(response)
+    state.version += 1
+    _append_event(session_id, state.version, "response", response.model_dump_json())
 
 
 def update_summary(session_id: str, round_key: str, summary_text: str) -> None:
     """Update a round summary."""
-    state = load_session(session_id)
-    state.summaries[round_key] = summary_text
-    save_session(state)
+    with open_session(session_id) as state:
+        state.summaries[round_key] = summary_text
 
 
 def append_note(session_id: str, note: UserNote) -> None:
-    """Append a user note."""
+    """Append a user note (logged as an event; session.json catches up on the next save)."""
     state = load_session(session_id)
     state.user_notes.append(note)
-    save_session(state)
+    state.version += 1
+    _append_event(session_id, state.version, "note", note.model_dump_json())
 
     # Also append to user_notes.md
     notes_path = SESSIONS_DIR / session_id / "user_notes.md"
     with open(notes_path, "a", encoding="utf-8") as f:
-        f.write(f"\n## Note after {note.after_phase} (Stage {note.stage})\n\n")
-        f.write(f"*{note.timestamp}*\n\n{note.text}\n\n---\n")
+        f.write(f"\n## Note after {note.after_phase} (Stage {note.stage})\n\n"
+                f"*{note.timestamp}*\n\n{note.text}\n\n---\n")
+
 
+def save_markdown(session_id: str, filename: str, content) -> None:
+    """Save a markdown file to the session directory.
 
-def save_markdown(session_id: str, filename: str, content: str) -> None:
-    """Save a markdown file to the session directory."""
+    ``content`` is either a string or a buffer-like writer exposing ``getvalue()``.
+    """
+    if hasattr(content, "getvalue"):
+        content = content.getvalue()
     path = SESSIONS_DIR / session_id / filename
     path.write_text(content, encoding="utf-8")
 
@@ -114,4 +340,4 @@ def save_markdown(session_id: str, filename: str, content: str) -> None:
 def get_responses_by_phase(session_id: str, phase: str) -> list[RoundResponse]:
     """Get all responses for a specific phase."""
     state = load_session(session_id)
-    return [r for r in state.responses if r.phase == phase]
+    return state.responses_for(phase)
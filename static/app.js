@@ -1,7 +1,8 @@
 /* Brainstorm Web App — Vanilla JS */
 
 let currentSessionId = null;
-let pollInterval = null;
+let polling = false;
+let pollGeneration = 0;
 let loadingMsgInterval = null;
 let loadingMsgIndex = 0;
 
@@ -474,18 +475,34 @@ async function newStage() {
 
 // ── Polling ─────────────────────────────────────────────────
 
+// Long-poll /status: the server holds the request until the session version changes
+// (or 30s pass), and we only re-fetch the full session when it did change.
+
 function startPolling() {
-  stopPolling();
-  pollInterval = setInterval(async () => {
-    await refreshDebate();
-  }, 3000);
+  if (polling) return;
+  polling = true;
+  longPoll(++pollGeneration);
+}
+
+async function longPoll(gen) {
+  let version = -1;
+  while (polling && gen === pollGeneration && currentSessionId) {
+    try {
+      const st = await api("GET", `/sessions/${currentSessionId}/status?wait=30&since=${version}`);
+      if (gen !== pollGeneration) return;
+      if (st.version !== version) {
+        version = st.version;
+        await refreshDebate();
+      }
+    } catch (e) {
+      await new Promise(resolve => setTimeout(resolve, 3000));
+    }
+  }
 }
 
 function stopPolling() {
-  if (pollInterval) {
-    clearInterval(pollInterval);
-    pollInterval = null;
-  }
+  polling = false;
+  pollGeneration++;
 }
 
 // ── Round toggle ────────────────────────────────────────────
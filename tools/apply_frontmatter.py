@@ -11,6 +11,9 @@ if not os.path.exists(exported_path):
 exported=json.load(open(exported_path))
 updated=[]
 pattern=re.compile(r'[^0-9A-Za-z\u4e00-\u9fff]+')
+# first line with any non-whitespace char; group 1 is that line minus its leading whitespace
+FIRST_LINE_RE=re.compile(r'(?m)^[^\S\n]*(\S[^\n]*)')
+created=date.today().isoformat()  # same for every file in the batch
 for key in exported:
     sid,name=key.split('/',1)
     icloud_file=os.path.join(icloud_base,sid,name)
@@ -32,35 +35,22 @@ for key in exported:
             newtext=parts[2].lstrip('\n')
         else:
             newtext=stripped
-    # find title
+    # find title: one regex search instead of splitting the whole file into lines
     title=''
-    for line in newtext.splitlines():
-        s=line.strip()
-        if not s: continue
-        if s.startswith('#'):
-            title=re.sub(r'^#+\s*','',s)
-        else:
-            title=s
-        break
+    m=FIRST_LINE_RE.search(newtext)
+    if m:
+        title=m.group(1).rstrip()
+        if title.startswith('#'):
+            title=title.lstrip('#').lstrip()
     if not title:
         title='Untitled'
     # slug tag: keep letters, numbers, chinese; replace others with underscore
     tag=pattern.sub('_', title.strip()).strip('_').lower()
     if not tag:
         tag='topic'
-    created=date.today().isoformat()
-    source=f'sessions/{sid}/{name}'
     title_esc=title.replace('"','\\"')
-    fm_lines=[
-        '---',
-        f'title: "{title_esc}"',
-        f'tags: [brainstorm, {tag}]',
-        f'created: {created}',
-        f'source: {source}',
-        '---',
-        ''
-    ]
-    fm='\n'.join(fm_lines)
+    fm=(f'---\ntitle: "{title_esc}"\ntags: [brainstorm, {tag}]\n'
+        f'created: {created}\nsource: sessions/{sid}/{name}\n---\n')
     out=fm+newtext
     try:
         with open(icloud_file,'w',encoding='utf-8') as f:
@@ -2,9 +2,17 @@
 import os
 import time
 import json
+import hashlib
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+try:
+    # Native FS events (FSEvents on macOS); installed with uvicorn[standard]
+    from watchfiles import watch
+except ImportError:
+    watch = None
+
 BASE = os.path.expanduser('~/research_project/brainstorm')
 SESSIONS = os.path.join(BASE, 'sessions')
 LOGDIR = os.path.join(BASE, 'LOGS')
@@ -14,7 +22,9 @@ EXPORT_LOG = os.path.join(LOGDIR, 'export.log')
 # iCloud target
 ICLOUD_VAULT = os.path.expanduser('~/Library/Mobile Documents/iCloud~md~obsidian/research_project/brainstorm/sessions')
 
-POLL_SECONDS = 10
+POLL_SECONDS = 10    # fallback scan interval when watchfiles isn't available
+DEBOUNCE_MS = 500    # coalesce bursts of writes (a round saves several files) into one pass
+MAX_WORKERS = 8      # concurrent file exports, so one stalled iCloud write doesn't hold up the rest
 
 os.makedirs(LOGDIR, exist_ok=True)
 os.makedirs(ICLOUD_VAULT, exist_ok=True)
@@ -33,9 +43,10 @@ def log(msg):
     print(line, end='')
 
 
-def add_frontmatter_if_missing(src_path, dest_path, session_id):
-    with open(src_path,'r') as f:
-        text = f.read()
+def add_frontmatter_if_missing(src_path, dest_path, session_id, text=None):
+    if text is None:
+        with open(src_path,'r') as f:
+            text = f.read()
     # check if has YAML frontmatter
     if text.startswith('---'):
         out = text
@@ -50,43 +61,91 @@ def add_frontmatter_if_missing(src_path, dest_path, session_id):
         f.write(out)
 
 
-def process():
+def export_one(sid, src, dest, mtime, prev_sha):
+    """Export one file; returns its new exported.json entry and whether dest was written."""
+    with open(src,'rb') as f:
+        data = f.read()
+    sha = hashlib.sha256(data).hexdigest()
+    entry = {'mtime': mtime, 'sha': sha}
+    if sha == prev_sha:
+        return entry, False  # touched or re-saved with identical content: don't rewrite to iCloud
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    add_frontmatter_if_missing(src, dest, sid, data.decode('utf-8'))
+    return entry, True
+
+
+def process(sids=None):
+    """Export new or changed .md files, from every session or just the ``sids`` given."""
     # iterate sessions
     if not os.path.isdir(SESSIONS):
         return
-    for sid in os.listdir(SESSIONS):
-        sdir = os.path.join(SESSIONS, sid)
-        if not os.path.isdir(sdir):
-            continue
+    if sids is None:
+        # scandir entries know their type from the directory read, so no isdir()/getmtime() per path
+        with os.scandir(SESSIONS) as sessions:
+            session_dirs = [(e.name, e.path) for e in sessions if e.is_dir()]
+    else:
+        session_dirs = [(sid, os.path.join(SESSIONS, sid)) for sid in sids]
+        session_dirs = [(sid, path) for sid, path in session_dirs if os.path.isdir(path)]
+    jobs = []
+    for sid, sdir in session_dirs:
         target_folder = os.path.join(ICLOUD_VAULT, sid)
-        os.makedirs(target_folder, exist_ok=True)
         # scan for md files of interest
-        for name in os.listdir(sdir):
-            if not name.lower().endswith('.md'):
-                continue
-            src = os.path.join(sdir, name)
-            dest = os.path.join(target_folder, name)
+        with os.scandir(sdir) as files:
+            md_files = [e for e in files if e.name.lower().endswith('.md') and e.is_file()]
+        for entry in md_files:
+            name = entry.name
             key = f"{sid}/{name}"
-            mtime = os.path.getmtime(src)
-            prev = exported.get(key, 0)
-            if mtime <= prev:
+            mtime = entry.stat().st_mtime
+            prev = exported.get(key, {})
+            if not isinstance(prev, dict):  # entry from before hashes were kept: bare mtime
+                prev = {'mtime': prev}
+            if mtime <= prev.get('mtime', 0):
                 continue
-            try:
-                add_frontmatter_if_missing(src, dest, sid)
-                exported[key] = mtime
-                log(f"exported {key} -> {dest}")
-            except Exception as e:
-                log(f"ERROR exporting {key}: {e}")
-    # write exported state
-    with open(EXPORTED,'w') as f:
-        json.dump(exported, f)
+            jobs.append((key, sid, entry.path, os.path.join(target_folder, name), mtime, prev.get('sha')))
+    dirty = False
+    if jobs:
+        # File I/O releases the GIL; results (and the log) are handled here on the main thread
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs))) as pool:
+            futures = {pool.submit(export_one, sid, src, dest, mtime, prev_sha): (key, dest)
+                       for key, sid, src, dest, mtime, prev_sha in jobs}
+            for fut in as_completed(futures):
+                key, dest = futures[fut]
+                try:
+                    exported[key], written = fut.result()
+                except Exception as e:
+                    log(f"ERROR exporting {key}: {e}")
+                    continue
+                dirty = True
+                if written:
+                    log(f"exported {key} -> {dest}")
+    # write exported state, only when this pass changed it (most passes find nothing new)
+    if dirty:
+        with open(EXPORTED,'w') as f:
+            json.dump(exported, f)
+
+
+def changed_sessions(changes):
+    """Session ids with a changed top-level .md file in a batch of watchfiles changes."""
+    sids = set()
+    for _, path in changes:
+        parts = os.path.relpath(path, SESSIONS).split(os.sep)
+        if len(parts) == 2 and parts[1].lower().endswith('.md'):
+            sids.add(parts[0])
+    return sids
 
 
 if __name__=='__main__':
     log('export_to_obsidian watcher started')
     try:
-        while True:
-            process()
-            time.sleep(POLL_SECONDS)
+        process()  # catch up on anything written while the watcher wasn't running
+        if watch is not None and os.path.isdir(SESSIONS):
+            for changes in watch(SESSIONS, debounce=DEBOUNCE_MS):
+                sids = changed_sessions(changes)
+                if sids:
+                    process(sids)
+        else:
+            while True:
+                time.sleep(POLL_SECONDS)
+                process()
     except KeyboardInterrupt:
         log('export_to_obsidian watcher stopped')
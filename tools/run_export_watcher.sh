@@ -1,6 +1,11 @@
 #!/usr/bin/env bash
 cd "$(dirname "$0")"
 # Run the export_to_obsidian watcher in background with nohup
-PYTHON=$(which python3 || echo python3)
+# Prefer the app's venv (created by run.sh): it has watchfiles for event-driven exports
+if [ -x ../venv/bin/python3 ]; then
+    PYTHON=../venv/bin/python3
+else
+    PYTHON=$(which python3 || echo python3)
+fi
 nohup "$PYTHON" export_to_obsidian.py >> /Users/minime/research_project/brainstorm/LOGS/export_stdout.log 2>&1 &
 echo $! > /Users/minime/research_project/brainstorm/LOGS/export_watcher.pid